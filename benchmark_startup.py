@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for the three entry-point scripts.
+
+Runs each script's module import in a fresh interpreter under
+`python -X importtime` and reports how long it takes before main() can run.
+Exits non-zero when any script exceeds the threshold or pulls in one of the
+heavy dependencies that should only load on the code paths that use them.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+SCRIPTS = ('problem1_api_books', 'problem2_visualization', 'problem3_csv_import')
+HEAVY_MODULES = ('matplotlib', 'requests', 'pandas', 'numpy', 'pyarrow')
+DEFAULT_THRESHOLD_MS = 100.0
+
+
+def _run(code, importtime=False):
+    """Run `code` in a fresh interpreter from the repo directory"""
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ['-X', 'importtime']
+    cmd += ['-c', code]
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    started = time.perf_counter()
+    result = subprocess.run(cmd, cwd=repo_dir, capture_output=True, text=True, check=True)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def parse_importtime(stderr):
+    """Return [(depth, module, cumulative_us)] from -X importtime output, in order"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, name.strip(), int(cumulative_us)))
+    return entries
+
+
+def module_subtree(entries, module):
+    """Return (cumulative_us, children) for a top-level module import"""
+    # importtime prints children before their parent, so the subtree is the
+    # run of nested entries directly above the module's own line
+    for index, (depth, name, cumulative) in enumerate(entries):
+        if depth == 0 and name == module:
+            start = index
+            while start > 0 and entries[start - 1][0] > 0:
+                start -= 1
+            return cumulative, entries[start:index]
+    raise ValueError(f"{module} not found in -X importtime output")
+
+
+def measure(module, repeat=5):
+    """Measure one script: best-of-N import cost, wall time and heavy modules loaded"""
+    probe = (f"import sys; import {module}; "
+             f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    import_ms, wall_ms = [], []
+    for _ in range(repeat):
+        result, elapsed = _run(probe, importtime=True)
+        cumulative, children = module_subtree(parse_importtime(result.stderr), module)
+        import_ms.append(cumulative / 1000)
+        wall_ms.append(elapsed)
+
+    # Heaviest direct imports of the script from the last run, for the report
+    heaviest = sorted(((cumulative, name) for depth, name, cumulative in children
+                       if depth == 1), reverse=True)[:5]
+    loaded = [name for name in result.stdout.strip().split(',') if name]
+    return {
+        'module': module,
+        'import_ms': min(import_ms),
+        'wall_ms': min(wall_ms),
+        'heavy_loaded': loaded,
+        'heaviest': [(name, cumulative / 1000) for cumulative, name in heaviest],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threshold-ms', type=float, default=DEFAULT_THRESHOLD_MS,
+                        help='maximum import time before main() (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='fresh interpreters per script; the best run is kept')
+    args = parser.parse_args()
+
+    _, baseline = _run('pass')
+    for _ in range(args.repeat - 1):
+        baseline = min(baseline, _run('pass')[1])
+
+    print("=" * 60)
+    print("STARTUP BENCHMARK")
+    print("=" * 60)
+    print(f"Interpreter baseline (python -c pass): {baseline:.1f} ms")
+    print(f"Threshold: {args.threshold_ms:.0f} ms to reach main()\n")
+
+    failures = 0
+    for module in SCRIPTS:
+        result = measure(module, args.repeat)
+        ok = result['import_ms'] <= args.threshold_ms and not result['heavy_loaded']
+        failures += not ok
+
+        print(f"{'✓' if ok else '✗'} {module}: {result['import_ms']:.1f} ms import, "
+              f"{result['wall_ms'] - baseline:.1f} ms over baseline")
+        if result['heavy_loaded']:
+            print(f"  ⚠ Loaded at import: {', '.join(result['heavy_loaded'])}")
+        for name, ms in result['heaviest']:
+            print(f"    {ms:7.1f} ms  {name}")
+
+    print("=" * 60)
+    if failures:
+        print(f"✗ {failures} script(s) regressed past the startup budget")
+        return 1
+    print("✓ All scripts reach main() within the startup budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
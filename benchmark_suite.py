@@ -0,0 +1,660 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the three pipelines.
+
+Generates scaled synthetic inputs (a users CSV with duplicate and invalid
+rows, a student cohort, and Google Books pages served by a local stub
+server), runs CSVDatabaseImporter, StudentScoreAnalyzer and BookAPIHandler
+end to end and writes throughput, latency percentiles and peak memory to a
+JSON results file. concurrent_reads measures query latency on users.db
+while a bulk import is writing to it, and bulk_reload times a reload that is
+90% duplicates with import_users() and each bulk_import() conflict mode.
+csv_validation times read_csv() with both validation backends on a BOM-
+prefixed file with edge-case rows and fails if their results differ.
+Pass --compare with an earlier results file to flag regressions between
+commits.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from pipeline_metrics import peak_rss_mb, percentile
+
+# Input sizes per --scale; any of them can be overridden on the command line
+SCALES = {
+    'small': {'csv_rows': 20000, 'students': 5000, 'subjects': 5,
+              'book_queries': 4, 'book_pages': 3},
+    'medium': {'csv_rows': 200000, 'students': 100000, 'subjects': 8,
+               'book_queries': 10, 'book_pages': 5},
+    'large': {'csv_rows': 2000000, 'students': 1000000, 'subjects': 12,
+              'book_queries': 25, 'book_pages': 10},
+}
+
+CITIES = ['New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix', 'Philadelphia',
+          'San Antonio', 'San Diego', 'Dallas', 'San Jose', 'Austin', 'Seattle']
+SUBJECTS = ['Math', 'Science', 'English', 'History', 'Geography', 'Physics',
+            'Chemistry', 'Biology', 'Art', 'Music', 'Economics', 'Computing']
+
+# One kind of bad row per rule in CSVDatabaseImporter._check_row()
+INVALID_ROWS = [
+    lambda i: ['', f'missing.name{i}@example.com', '+1-555-0100', '30', 'Austin'],
+    lambda i: [f'User {i}', f'not-an-email-{i}', '+1-555-0100', '30', 'Austin'],
+    lambda i: [f'User {i}', f'old{i}@example.com', '+1-555-0100', '150', 'Austin'],
+    lambda i: [f'User {i}', f'age{i}@example.com', '+1-555-0100', 'thirty', 'Austin'],
+]
+
+# Values the vectorised validation backend cannot take at face value; it has
+# to emulate int() and re.match() on each of them to agree with the row loop
+EDGE_CASE_ROWS = [
+    ['Padded', 'padded@example.com', '', ' 42 ', 'Austin'],
+    ['Underscore', 'underscore@example.com', '', '1_0', 'Austin'],
+    ['Double underscore', 'double.underscore@example.com', '', '1__0', 'Austin'],
+    ['Signed', 'signed@example.com', '', '+7', 'Austin'],
+    ['Negative', 'negative@example.com', '', '-1', 'Austin'],
+    ['Arabic digits', 'arabic@example.com', '', '\u0664\u0662', 'Austin'],
+    ['No-break space', 'nbsp@example.com', '', '\u00a042', 'Austin'],
+    ['Inner space', 'inner.space@example.com', '', '4 2', 'Austin'],
+    ['Trailing newline', 'newline@example.com\n', '', '30', 'Austin'],
+    ['Leading space', ' leading@example.com', '', '30', 'Austin'],
+    ['Multi-line city', 'multiline@example.com', '', '30', 'Line 1\nLine 2'],
+]
+
+
+def latency_summary(samples):
+    """Nearest-rank p50/p95/p99 and max of a list of durations, in milliseconds"""
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+
+    def rank(fraction):
+        return round(percentile(ordered, fraction) * 1000, 3)
+
+    return {'count': len(ordered), 'p50_ms': rank(0.50), 'p95_ms': rank(0.95),
+            'p99_ms': rank(0.99), 'max_ms': round(ordered[-1] * 1000, 3)}
+
+
+def _timed(function, samples):
+    """Wrap function so the duration of every call is appended to samples"""
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - started)
+    return wrapper
+
+
+# ---------------------------------------------------------------------------
+# Synthetic data generators
+# ---------------------------------------------------------------------------
+
+def write_users_csv(filename, rows, duplicate_ratio=0.05, invalid_ratio=0.02, seed=0,
+                    encoding='utf-8'):
+    """
+    Write a users CSV of `rows` data rows. About duplicate_ratio of them reuse
+    an earlier row's email and about invalid_ratio fail validation.
+    Returns the number of rows of each kind.
+    """
+    import csv
+
+    rng = random.Random(seed)
+    counts = {'valid': 0, 'duplicate': 0, 'invalid': 0}
+    with open(filename, 'w', newline='', encoding=encoding) as f:
+        writer = csv.writer(f)
+        writer.writerow(['name', 'email', 'phone', 'age', 'city'])
+        for i in range(rows):
+            draw = rng.random()
+            if draw < invalid_ratio:
+                writer.writerow(INVALID_ROWS[i % len(INVALID_ROWS)](i))
+                counts['invalid'] += 1
+                continue
+            if draw < invalid_ratio + duplicate_ratio and counts['valid']:
+                email = f'user{rng.randrange(counts["valid"])}@example.com'
+                counts['duplicate'] += 1
+            else:
+                email = f'user{counts["valid"]}@example.com'
+                counts['valid'] += 1
+            age = str(rng.randint(18, 90)) if rng.random() < 0.9 else ''
+            writer.writerow([f'User {i}', email, f'+1-555-{rng.randint(0, 9999):04d}',
+                             age, rng.choice(CITIES)])
+    return counts
+
+
+def make_cohort(students, subjects, seed=0):
+    """Build a StudentStore with `students` students scored in `subjects` subjects"""
+    from problem2_visualization import StudentStore
+
+    rng = random.Random(seed)
+    # Past the built-in list, subject names repeat with a numeric suffix
+    names = [SUBJECTS[i % len(SUBJECTS)] + (f' {i // len(SUBJECTS) + 1}' if i >= len(SUBJECTS) else '')
+             for i in range(subjects)]
+    store = StudentStore(names)
+    for i in range(students):
+        store.append(i + 1, f'Student {i + 1}', [rng.randint(40, 100) for _ in names])
+    return store
+
+
+def books_page_payload(query, start_index, page_size, total_items):
+    """Deterministic Google Books volumes response for one page of a query"""
+    items = []
+    for index in range(start_index, min(start_index + page_size, total_items)):
+        seed = f'{query}:{index}'
+        rng = random.Random(seed)
+        volume = {
+            'title': f'{query.title()} Volume {index + 1}',
+            'authors': [f'Author {rng.randint(1, 500)}'],
+            'publishedDate': f'{rng.randint(1950, 2024)}-{rng.randint(1, 12):02d}-01',
+        }
+        # A quarter of the books have no ISBN and are keyed by title/author
+        if index % 4:
+            volume['industryIdentifiers'] = [
+                {'type': 'ISBN_13', 'identifier': f'978{rng.randrange(10 ** 10):010d}'}]
+        items.append({'kind': 'books#volume', 'volumeInfo': volume})
+    return {'kind': 'books#volumes', 'totalItems': total_items, 'items': items}
+
+
+class StubBooksServer:
+    """
+    Local HTTP server that answers Google Books volume queries with canned
+    pages, optionally after a fixed delay to stand in for network latency.
+    Use as a context manager; `url` is the endpoint to give BookAPIHandler.
+    """
+
+    def __init__(self, total_items=200, latency=0.0):
+        self.total_items = total_items
+        self.latency = latency
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.server = None
+        self.thread = None
+
+    def __enter__(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from urllib.parse import parse_qs, urlparse
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                params = parse_qs(urlparse(self.path).query)
+                query = params.get('q', [''])[0]
+                start_index = int(params.get('startIndex', ['0'])[0])
+                page_size = int(params.get('maxResults', ['10'])[0])
+                if stub.latency:
+                    time.sleep(stub.latency)
+                body = json.dumps(books_page_payload(query, start_index, page_size,
+                                                     stub.total_items)).encode('utf-8')
+                with stub.lock:
+                    stub.requests += 1
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f'http://{host}:{port}/books/v1/volumes'
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+
+# ---------------------------------------------------------------------------
+# Pipelines; each runs in its own process so peak RSS is per pipeline
+# ---------------------------------------------------------------------------
+
+def bench_csv_import(workdir, csv_rows, duplicate_ratio, invalid_ratio, batch_size=10000):
+    """Stream a synthetic CSV into SQLite, then page through it and read the statistics"""
+    from problem3_csv_import import CSVDatabaseImporter
+
+    filename = os.path.join(workdir, 'users.csv')
+    counts = write_users_csv(filename, csv_rows, duplicate_ratio, invalid_ratio)
+
+    importer = CSVDatabaseImporter(os.path.join(workdir, 'users.db'))
+    batch_latencies = []
+    page_latencies = []
+    stats_latencies = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        importer.create_database()
+        importer.configure_bulk_pragmas()
+        importer._write_batch = _timed(importer._write_batch, batch_latencies)
+        result = importer.stream_import(filename, batch_size=batch_size)
+
+        users_page = _timed(importer.users_page, page_latencies)
+        rows, cursor = users_page(limit=100)
+        for _ in range(199):
+            if cursor is None:
+                break
+            rows, cursor = users_page(limit=100, after=cursor)
+
+        get_statistics = _timed(importer.get_statistics, stats_latencies)
+        for _ in range(20):
+            get_statistics()
+        importer.close()
+
+    return {
+        'rows': csv_rows,
+        'generated': counts,
+        'inserted': result['inserted'],
+        'duplicates': result['duplicates'],
+        'invalid': result['invalid'],
+        'elapsed_s': round(result['elapsed'], 4),
+        'rows_per_sec': round(result['rows_per_sec'], 1),
+        'batch_latency': latency_summary(batch_latencies),
+        'page_latency': latency_summary(page_latencies),
+        'statistics_latency': latency_summary(stats_latencies),
+    }
+
+
+def bench_student_analysis(workdir, students, subjects, repeats=5):
+    """Compute statistics with every backend, render headless and export a cohort"""
+    from problem2_visualization import StudentScoreAnalyzer
+
+    analyzer = StudentScoreAnalyzer()
+    started = time.perf_counter()
+    analyzer.student_data = make_cohort(students, subjects)
+    results = {'students': students, 'subjects': subjects,
+               'generate_s': round(time.perf_counter() - started, 4), 'backends': {}}
+
+    stats = None
+    for backend in ('python', 'numpy', 'streaming'):
+        samples = []
+        try:
+            for _ in range(repeats):
+                analyzer.subjects = analyzer.scores = None
+                started = time.perf_counter()
+                stats = analyzer.calculate_statistics(backend=backend)
+                samples.append(time.perf_counter() - started)
+        except ImportError as e:
+            results['backends'][backend] = {'skipped': str(e)}
+            continue
+        best = min(samples)
+        results['backends'][backend] = {
+            'latency': latency_summary(samples),
+            'students_per_sec': round(students / best, 1) if best > 0 else 0.0,
+        }
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        render_samples = []
+        for _ in range(3):
+            started = time.perf_counter()
+            analyzer.create_visualizations(stats, headless=True, dpi=100,
+                                           filename=os.path.join(workdir, 'scores.png'))
+            render_samples.append(time.perf_counter() - started)
+        results['render_latency'] = latency_summary(render_samples)
+
+        for extension in ('jsonl', 'npz'):
+            started = time.perf_counter()
+            try:
+                analyzer.export_results(stats, os.path.join(workdir, f'results.{extension}'))
+            except ImportError as e:
+                results[f'export_{extension}'] = {'skipped': str(e)}
+                continue
+            elapsed = time.perf_counter() - started
+            results[f'export_{extension}'] = {
+                'elapsed_s': round(elapsed, 4),
+                'students_per_sec': round(students / elapsed, 1) if elapsed > 0 else 0.0,
+            }
+    return results
+
+
+def bench_book_ingest(workdir, book_queries, book_pages, page_size=40, workers=8,
+                      stub_latency=0.005):
+    """Ingest canned pages from the stub server, then page through the stored books"""
+    from problem1_api_books import BookAPIHandler
+
+    queries = [f'benchmark topic {i}' for i in range(book_queries)]
+    with StubBooksServer(total_items=book_pages * page_size, latency=stub_latency) as stub:
+        handler = BookAPIHandler(db_name=os.path.join(workdir, 'books.db'), api_url=stub.url)
+        page_latencies = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            handler.create_database()
+            report = handler.ingest_books(queries, max_pages=book_pages, page_size=page_size,
+                                          max_workers=workers, requests_per_second=1e6)
+            books_page = _timed(handler.books_page, page_latencies)
+            rows, cursor = books_page(limit=50)
+            while cursor is not None and len(page_latencies) < 200:
+                rows, cursor = books_page(limit=50, after=cursor)
+            handler.close()
+        requests_served = stub.requests
+
+    return {
+        'queries': book_queries,
+        'pages': report['pages'],
+        'failed_pages': report['failed_pages'],
+        'books': report['books'],
+        'requests': requests_served,
+        'elapsed_s': round(report['elapsed'], 4),
+        'pages_per_sec': round(report['pages_per_sec'], 1),
+        'request_latency': {
+            'p50_ms': round(report['latency_p50'] * 1000, 3),
+            'p95_ms': round(report['latency_p95'] * 1000, 3),
+            'p99_ms': round(report['latency_p99'] * 1000, 3),
+            'max_ms': round(report['latency_max'] * 1000, 3),
+        },
+        'page_latency': latency_summary(page_latencies),
+    }
+
+
+def _synthetic_users(rows, start=0, seed=0):
+    """Valid user dicts (emails user<start>... upwards) for imports that skip CSV parsing"""
+    rng = random.Random(seed)
+    for i in range(start, start + rows):
+        yield {'name': f'User {i}', 'email': f'user{i}@example.com',
+               'phone': f'+1-555-{rng.randint(0, 9999):04d}', 'age': rng.randint(18, 90),
+               'city': rng.choice(CITIES)}
+
+
+def bench_bulk_reload(workdir, csv_rows, duplicate_ratio=0.9, batch_size=10000):
+    """
+    Reload csv_rows users into a table that already holds duplicate_ratio of
+    them: the per-row import_users() against bulk_import() in each conflict mode
+    """
+    import shutil
+    from problem3_csv_import import CSVDatabaseImporter
+
+    preloaded = os.path.join(workdir, 'preloaded.db')
+    importer = CSVDatabaseImporter(preloaded)
+    with contextlib.redirect_stdout(io.StringIO()):
+        importer.create_database()
+        importer.bulk_import(_synthetic_users(int(csv_rows * duplicate_ratio)),
+                             batch_size=batch_size)
+        importer.close()
+
+    users = list(_synthetic_users(csv_rows))
+    results = {'rows': csv_rows, 'duplicate_ratio': duplicate_ratio}
+    for method in ('import_users', 'skip', 'update', 'upsert'):
+        database = os.path.join(workdir, f'{method}.db')
+        shutil.copyfile(preloaded, database)
+        importer = CSVDatabaseImporter(database)
+        # import_users() prints a line per duplicate; /dev/null keeps that out of memory
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            importer.create_database()
+            started = time.perf_counter()
+            if method == 'import_users':
+                importer.import_users(users)
+            else:
+                importer.bulk_import(users, on_conflict=method, batch_size=batch_size)
+            elapsed = time.perf_counter() - started
+            importer.close()
+        results[method] = {'elapsed_s': round(elapsed, 4),
+                           'rows_per_sec': round(csv_rows / elapsed, 1) if elapsed > 0 else 0.0}
+        if method != 'import_users':
+            results[method]['speedup'] = round(results['import_users']['elapsed_s'] / elapsed, 2)
+    return results
+
+
+def bench_csv_validation(workdir, csv_rows, invalid_ratio):
+    """
+    read_csv() with the python and pandas backends on a UTF-8-BOM file that
+    ends in EDGE_CASE_ROWS; raises if they accept or reject different rows
+    """
+    import csv
+    from problem3_csv_import import CSVDatabaseImporter
+
+    try:
+        import pandas  # noqa: F401
+    except ImportError as e:
+        return {'skipped': str(e)}
+
+    filename = os.path.join(workdir, 'users.csv')
+    write_users_csv(filename, csv_rows, invalid_ratio=invalid_ratio, encoding='utf-8-sig')
+    with open(filename, 'a', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows(EDGE_CASE_ROWS)
+
+    importer = CSVDatabaseImporter(os.path.join(workdir, 'users.db'))
+    results = {'rows': csv_rows + len(EDGE_CASE_ROWS)}
+    users = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for backend in ('python', 'pandas'):
+            started = time.perf_counter()
+            users[backend] = importer.read_csv(filename, backend=backend)
+            elapsed = time.perf_counter() - started
+            results[backend] = {'elapsed_s': round(elapsed, 4),
+                                'rows_per_sec': round(results['rows'] / elapsed, 1)
+                                if elapsed > 0 else 0.0}
+    results['speedup'] = round(results['python']['elapsed_s']
+                               / max(results['pandas']['elapsed_s'], 1e-9), 2)
+
+    errors = []
+    expected = list(importer.iter_csv(filename, errors))
+    rejected = [f'Row {row}: {reason}'
+                for row, reason in importer.rejected_rows.itertuples(index=False)]
+    if not expected or users['python'] != expected or users['pandas'] != expected \
+            or rejected != errors:
+        raise RuntimeError(f"Validation backends disagree on '{filename}'")
+    results['backends_match'] = True
+    results['invalid'] = len(errors)
+    return results
+
+
+def bench_concurrent_reads(workdir, csv_rows, batch_size=None, interval=0.01):
+    """
+    Read latency of display and statistics queries while a bulk import runs in
+    another thread: once with queries on the writer connection (readers=0, the
+    single-connection layout) and once on the WAL reader pool.
+    """
+    from problem3_csv_import import CSVDatabaseImporter
+
+    # About ten write transactions, each long enough to overlap many reads
+    batch_size = batch_size or max(1000, csv_rows // 10)
+    results = {}
+    for mode, readers in (('shared_connection', 0), ('reader_pool', 4)):
+        importer = CSVDatabaseImporter(os.path.join(workdir, f'{mode}.db'), readers=readers)
+        with contextlib.redirect_stdout(io.StringIO()):
+            importer.create_database()
+            # Something to read before the first batch commits
+            importer.bulk_import(_synthetic_users(1000), batch_size=1000)
+
+            report = {}
+
+            def run_import():
+                report.update(importer.bulk_import(_synthetic_users(csv_rows, start=1000),
+                                                   batch_size=batch_size))
+
+            writer = threading.Thread(target=run_import)
+            page_latencies = []
+            stats_latencies = []
+            users_page = _timed(importer.users_page, page_latencies)
+            get_statistics = _timed(importer.get_statistics, stats_latencies)
+            writer.start()
+            while writer.is_alive():
+                users_page(limit=50)
+                get_statistics()
+                time.sleep(interval)
+            writer.join()
+            importer.close()
+
+        results[mode] = {
+            'rows_per_sec': round(report['rows_per_sec'], 1),
+            'page_latency': latency_summary(page_latencies),
+            'statistics_latency': latency_summary(stats_latencies),
+        }
+    return results
+
+
+PIPELINES = {
+    'csv_import': (bench_csv_import, ('csv_rows', 'duplicate_ratio', 'invalid_ratio')),
+    'student_analysis': (bench_student_analysis, ('students', 'subjects')),
+    'book_ingest': (bench_book_ingest, ('book_queries', 'book_pages')),
+    'concurrent_reads': (bench_concurrent_reads, ('csv_rows',)),
+    'bulk_reload': (bench_bulk_reload, ('csv_rows',)),
+    'csv_validation': (bench_csv_validation, ('csv_rows', 'invalid_ratio')),
+}
+
+
+def _run_pipeline(name, workdir, params):
+    """Child-process entry point: run one pipeline and attach its peak memory"""
+    function, _ = PIPELINES[name]
+    started = time.perf_counter()
+    result = function(workdir, **params)
+    result['wall_s'] = round(time.perf_counter() - started, 4)
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Results files
+# ---------------------------------------------------------------------------
+
+def _git_commit():
+    """Commit hash of the working tree, or None outside a git checkout"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten_metrics(results, prefix=''):
+    """{'a': {'b': 1}} -> {'a.b': 1} for the numeric leaves of a results tree"""
+    flat = {}
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(flatten_metrics(value, name + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def _direction(metric):
+    """+1 when bigger is better, -1 when smaller is better, 0 when not a performance metric"""
+    leaf = metric.rsplit('.', 1)[-1]
+    if leaf.endswith('_per_sec'):
+        return 1
+    if leaf.endswith(('_ms', '_s', '_mb')):
+        return -1
+    return 0
+
+
+def compare_results(baseline, current, tolerance=0.10):
+    """Print metric changes against a baseline run and return the regressions"""
+    before = flatten_metrics(baseline['results'])
+    after = flatten_metrics(current['results'])
+    regressions = []
+
+    print(f"\nComparison with {baseline['meta'].get('commit') or 'baseline'} "
+          f"(tolerance {tolerance:.0%})")
+    if baseline['meta'].get('config') != current['meta'].get('config'):
+        print("  ⚠ Input sizes differ from the baseline; changes may not be regressions")
+    for metric in sorted(before.keys() & after.keys()):
+        direction = _direction(metric)
+        old, new = before[metric], after[metric]
+        if not direction or not old:
+            continue
+        change = (new - old) / old
+        worse = -change * direction > tolerance
+        better = change * direction > tolerance
+        if worse:
+            regressions.append(metric)
+        if worse or better:
+            print(f"  {'✗' if worse else '✓'} {metric}: {old:g} -> {new:g} ({change:+.1%})")
+    if not regressions:
+        print("✓ No regressions beyond tolerance")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--pipelines', nargs='+', choices=sorted(PIPELINES),
+                        default=list(PIPELINES))
+    parser.add_argument('--csv-rows', type=int)
+    parser.add_argument('--duplicate-ratio', type=float, default=0.05)
+    parser.add_argument('--invalid-ratio', type=float, default=0.02)
+    parser.add_argument('--students', type=int)
+    parser.add_argument('--subjects', type=int)
+    parser.add_argument('--book-queries', type=int)
+    parser.add_argument('--book-pages', type=int)
+    parser.add_argument('--output', default='benchmark_results.json',
+                        help='results file to write (default: %(default)s)')
+    parser.add_argument('--compare', metavar='RESULTS',
+                        help='earlier results file; exit 1 on regressions past --tolerance')
+    parser.add_argument('--tolerance', type=float, default=0.10)
+    args = parser.parse_args()
+
+    config = dict(SCALES[args.scale])
+    config.update(duplicate_ratio=args.duplicate_ratio, invalid_ratio=args.invalid_ratio)
+    for key in config:
+        if getattr(args, key, None) is not None:
+            config[key] = getattr(args, key)
+
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    print("=" * 60)
+    print(f"BENCHMARK SUITE ({args.scale})")
+    print("=" * 60)
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory(prefix='bench_') as workdir:
+        for name in args.pipelines:
+            params = {key: config[key] for key in PIPELINES[name][1]}
+            pipeline_dir = os.path.join(workdir, name)
+            os.makedirs(pipeline_dir)
+            # A fresh interpreter per pipeline keeps peak RSS from leaking across them
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                results[name] = pool.submit(_run_pipeline, name, pipeline_dir, params).result()
+            result = results[name]
+            print(f"✓ {name}: {result['wall_s']:.2f}s wall, "
+                  f"peak RSS {result['peak_rss_mb'] or 0:.1f} MB")
+
+    for name, result in results.items():
+        print(f"\n{name}")
+        for metric, value in flatten_metrics(result).items():
+            if _direction(metric):
+                print(f"  {metric:<40} {value:>14,.3f}")
+
+    document = {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'scale': args.scale,
+            'config': config,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+    print(f"\n✓ Results written to '{args.output}'")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare_results(baseline, document, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
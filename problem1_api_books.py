@@ -1,18 +1,212 @@
 
 import sqlite3
-import requests
 import json
+import hashlib
+import random
+import re
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
 
+from pipeline_metrics import PipelineMetrics, percentile
+from sqlite_access import Database
+
+# requests is imported inside the methods that talk HTTP, so runs that only
+# read books.db do not pay for loading it
+
+GOOGLE_BOOKS_URL = "https://www.googleapis.com/books/v1/volumes"
+
+# Largest page the Google Books volumes endpoint will return
+MAX_PAGE_SIZE = 40
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token-bucket rate limiter (rate tokens/sec, burst capacity)"""
+    
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until a token is available, then consume it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def book_key(title, author, isbn):
+    """
+    Identity of a book for de-duplication: its ISBN-13 when known, otherwise
+    a hash of the case- and whitespace-normalised title and author.
+    """
+    if isbn:
+        digits = ''.join(ch for ch in str(isbn) if ch.isalnum())
+        if digits:
+            return f'isbn:{digits}'
+    normalised = '|'.join(' '.join(str(part or '').casefold().split()) for part in (title, author))
+    return 'hash:' + hashlib.sha1(normalised.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    Persistent, size-bounded HTTP response cache stored in SQLite.
+    
+    Entries are keyed by URL + params. Fresh entries (within TTL or the
+    server's max-age) are served without a request; stale ones are
+    revalidated with If-None-Match / If-Modified-Since, so a 304 reuses the
+    stored body. Least recently used entries are evicted past max_bytes.
+    """
+    
+    def __init__(self, path='http_cache.db', ttl=3600, max_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS http_cache (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_http_cache_access ON http_cache (last_access)')
+        self.conn.commit()
+    
+    def _key(self, url, params):
+        payload = json.dumps([url, sorted((params or {}).items())], default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _expiry(self, response, now):
+        """Honour Cache-Control max-age when the server sends it, else the default TTL"""
+        for directive in response.headers.get('Cache-Control', '').split(','):
+            name, _, value = directive.strip().partition('=')
+            if name.lower() == 'max-age' and value.isdigit():
+                return now + int(value)
+        return now + self.ttl
+    
+    def get(self, url, params=None, timeout=10, session=None):
+        """Return the response body for url+params, from cache when possible"""
+        key = self._key(url, params)
+        now = time.time()
+        with self.lock:
+            entry = self.conn.execute(
+                'SELECT body, etag, last_modified, expires_at FROM http_cache WHERE key = ?',
+                (key,)).fetchone()
+        
+        if entry and entry[3] > now:
+            with self.lock:
+                self.hits += 1
+                self.conn.execute('UPDATE http_cache SET last_access = ? WHERE key = ?', (now, key))
+                self.conn.commit()
+            return entry[0]
+        
+        # Only requests that go out to the network pay for importing requests
+        import requests
+        
+        http = session or requests
+        headers = {}
+        if entry and entry[1]:
+            headers['If-None-Match'] = entry[1]
+        if entry and entry[2]:
+            headers['If-Modified-Since'] = entry[2]
+        response = http.get(url, params=params, headers=headers, timeout=timeout)
+        
+        if response.status_code == 304:
+            if entry:
+                with self.lock:
+                    self.revalidations += 1
+                    self.conn.execute(
+                        'UPDATE http_cache SET expires_at = ?, last_access = ? WHERE key = ?',
+                        (self._expiry(response, now), now, key))
+                    self.conn.commit()
+                return entry[0]
+            # Nothing stored to reuse (e.g. evicted or another client's cache
+            # answered): fetch the full body without conditional headers
+            response = http.get(url, params=params, headers={'Cache-Control': 'no-cache'},
+                                timeout=timeout)
+            if response.status_code == 304:
+                raise requests.exceptions.HTTPError(
+                    f"304 Not Modified for {url} with no cached body to reuse", response=response)
+        
+        response.raise_for_status()
+        body = response.content
+        with self.lock:
+            self.misses += 1
+            if 'no-store' not in response.headers.get('Cache-Control', ''):
+                self.conn.execute('''
+                    INSERT OR REPLACE INTO http_cache
+                        (key, url, body, etag, last_modified, expires_at, last_access, size)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (key, response.url, body, response.headers.get('ETag'),
+                      response.headers.get('Last-Modified'), self._expiry(response, now),
+                      now, len(body)))
+                self._evict()
+                self.conn.commit()
+        return body
+    
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM http_cache').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self.conn.execute('SELECT key, size FROM http_cache ORDER BY last_access')
+        doomed = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        self.conn.executemany('DELETE FROM http_cache WHERE key = ?', doomed)
+    
+    def stats(self):
+        """Hit/miss/revalidation counters for this process"""
+        return {'hits': self.hits, 'misses': self.misses, 'revalidations': self.revalidations}
+    
+    def close(self):
+        self.conn.close()
+
 class BookAPIHandler:
-    def __init__(self, db_name='books.db'):
+    def __init__(self, db_name='books.db', api_url=GOOGLE_BOOKS_URL, cache=None, readers=4):
         self.db_name = db_name
+        self.readers = readers
+        self.api_url = api_url
+        self.cache = cache
+        # Database layer: self.conn is its writer, queries use its reader pool
+        self.db = None
         self.conn = None
         self.cursor = None
+        self.session = None
         
     def create_database(self):
         """Create SQLite database and books table"""
-        self.conn = sqlite3.connect(self.db_name)
+        # readers=0 sends queries through the writer, as before the pool existed
+        self.db = Database(self.db_name, readers=self.readers)
+        self.conn = self.db.writer
         self.cursor = self.conn.cursor()
         
         self.cursor.execute('''
@@ -22,11 +216,174 @@ class BookAPIHandler:
                 author TEXT NOT NULL,
                 publication_year INTEGER,
                 isbn TEXT,
-                fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                book_key TEXT
             )
         ''')
         self.conn.commit()
+        self.migrate_books_schema()
+        self.create_search_index()
         print(f"✓ Database '{self.db_name}' created successfully")
+    
+    def migrate_books_schema(self):
+        """
+        Bring an existing books table up to the de-duplicated schema: add and
+        backfill book_key, collapse duplicates (keeping the most recently
+        fetched row) and create the unique and lookup indexes. Idempotent.
+        """
+        columns = [row[1] for row in self.cursor.execute('PRAGMA table_info(books)')]
+        if 'book_key' not in columns:
+            self.cursor.execute('ALTER TABLE books ADD COLUMN book_key TEXT')
+        
+        self.cursor.execute('SELECT COUNT(*) FROM books WHERE book_key IS NULL')
+        missing = self.cursor.fetchone()[0]
+        if missing:
+            self.conn.create_function('book_key', 3, book_key, deterministic=True)
+            # Rows left unkeyed by an older build may duplicate keyed ones, so the
+            # unique index comes off until the duplicates below are collapsed
+            self.cursor.execute('DROP INDEX IF EXISTS idx_books_key')
+            self.cursor.execute('UPDATE books SET book_key = book_key(title, author, isbn) '
+                                'WHERE book_key IS NULL')
+            # rowcount, not total_changes, so the search index triggers are not counted
+            self.cursor.execute('''
+                DELETE FROM books
+                WHERE id NOT IN (SELECT MAX(id) FROM books GROUP BY book_key)
+            ''')
+            removed = self.cursor.rowcount
+            print(f"✓ Migrated books table: keyed {missing} rows, removed {removed} duplicates")
+        
+        self.cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_books_key ON books (book_key)')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_books_isbn ON books (isbn)')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_books_year ON books (publication_year)')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_books_author ON books (author)')
+        self.conn.commit()
+    
+    def create_search_index(self):
+        """
+        Create the FTS5 index over book titles and authors and the triggers
+        that keep it in step with the books table. Existing databases are
+        indexed once, the first time this runs. Returns False when the SQLite
+        build has no FTS5.
+        """
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'books_fts'")
+        exists = self.cursor.fetchone() is not None
+        try:
+            # External content: the index stores no second copy of the text.
+            # Prefix indexes make 2-3 character prefix queries index lookups.
+            self.cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+                    title, author,
+                    content='books', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2',
+                    prefix='2 3'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            print(f"⚠ Full-text search unavailable: {e}")
+            return False
+        
+        self.cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS books_fts_insert AFTER INSERT ON books
+            BEGIN
+                INSERT INTO books_fts (rowid, title, author) VALUES (NEW.id, NEW.title, NEW.author);
+            END
+        ''')
+        self.cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS books_fts_delete AFTER DELETE ON books
+            BEGIN
+                INSERT INTO books_fts (books_fts, rowid, title, author)
+                VALUES ('delete', OLD.id, OLD.title, OLD.author);
+            END
+        ''')
+        # store_books() upserts always SET title/author; only reindex real changes
+        self.cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS books_fts_update AFTER UPDATE OF title, author ON books
+            WHEN OLD.title IS NOT NEW.title OR OLD.author IS NOT NEW.author
+            BEGIN
+                INSERT INTO books_fts (books_fts, rowid, title, author)
+                VALUES ('delete', OLD.id, OLD.title, OLD.author);
+                INSERT INTO books_fts (rowid, title, author) VALUES (NEW.id, NEW.title, NEW.author);
+            END
+        ''')
+        self.conn.commit()
+        if not exists:
+            self.rebuild_search_index()
+        return True
+    
+    def rebuild_search_index(self):
+        """Re-index every book from the books table and merge the index b-trees"""
+        start = time.perf_counter()
+        self.cursor.execute("INSERT INTO books_fts (books_fts) VALUES ('rebuild')")
+        self.cursor.execute("INSERT INTO books_fts (books_fts) VALUES ('optimize')")
+        self.conn.commit()
+        self.cursor.execute('SELECT COUNT(*) FROM books')
+        total = self.cursor.fetchone()[0]
+        print(f"✓ Search index rebuilt for {total} books in {time.perf_counter() - start:.2f}s")
+    
+    def _match_expression(self, text, field=None, prefix=True):
+        """
+        Turn free text into an FTS5 MATCH expression. Every word is quoted, so
+        user input cannot inject query syntax; with prefix=True the words
+        match the start of indexed words ("prog pyth" finds "Python Programming").
+        """
+        words = re.findall(r'\w+', text)
+        if not words:
+            return None
+        expression = ' '.join(f'"{word}"' + ('*' if prefix else '') for word in words)
+        if field:
+            if field not in ('title', 'author'):
+                raise ValueError(f"Unknown search field: {field!r}")
+            expression = f'{field} : ({expression})'
+        return expression
+    
+    def search_books(self, text, limit=20, offset=0, field=None, prefix=True):
+        """
+        Full-text search over titles and authors, best bm25 match first.
+        field limits the search to 'title' or 'author'. Returns
+        (rows, next_offset) with rows as BOOK_COLUMNS plus the bm25 score
+        (lower is better) and next_offset None on the last page.
+        """
+        expression = self._match_expression(text, field, prefix)
+        if expression is None:
+            return [], None
+        
+        # Rank and page inside FTS5 first so only one page of books is looked up
+        columns = ', '.join(f'b.{column}' for column in self.BOOK_COLUMNS)
+        with self.db.reader() as conn:
+            rows = conn.execute(f'''
+                SELECT {columns}, hits.rank
+                FROM (
+                    SELECT rowid, rank FROM books_fts
+                    WHERE books_fts MATCH ?
+                    ORDER BY rank
+                    LIMIT ? OFFSET ?
+                ) AS hits
+                JOIN books b ON b.id = hits.rowid
+                ORDER BY hits.rank, b.id
+            ''', (expression, limit, offset)).fetchall()
+        
+        next_offset = offset + limit if len(rows) == limit else None
+        return rows, next_offset
+    
+    def display_search(self, text, limit=20, offset=0, field=None, output='table'):
+        """Print one page of search_books() results"""
+        start = time.perf_counter()
+        rows, next_offset = self.search_books(text, limit, offset, field)
+        elapsed = (time.perf_counter() - start) * 1000
+        
+        if output == 'jsonl':
+            for row in rows:
+                print(json.dumps(dict(zip(self.BOOK_COLUMNS + ('score',), row))))
+            return rows, next_offset
+        
+        print(f"\nSearch '{text}': {len(rows)} results from #{offset + 1} in {elapsed:.1f} ms")
+        for book in rows:
+            year = book[3] if book[3] else 'N/A'
+            print(f"{book[0]:>7}  {year!s:>4}  {book[6]:>7.2f}  "
+                  f"{book[1][:40]:<40}  {book[2][:30]}")
+        if next_offset is not None:
+            print(f"  ... more results at offset {next_offset}")
+        return rows, next_offset
         
     def fetch_books_from_api(self):
         """
@@ -35,37 +392,199 @@ class BookAPIHandler:
         """
         try:
             # Using Google Books API as example
-            api_url = "https://www.googleapis.com/books/v1/volumes"
+            api_url = self.api_url
             params = {
                 'q': 'python programming',
                 'maxResults': 10
             }
             
             print("Fetching data from API...")
-            response = requests.get(api_url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
+            if self.cache:
+                data = json.loads(self.cache.get(api_url, params=params, timeout=10))
+                stats = self.cache.stats()
+                print(f"  Cache: {stats['hits']} hits, {stats['misses']} misses, "
+                      f"{stats['revalidations']} revalidated")
+            else:
+                import requests
+                
+                response = requests.get(api_url, params=params, timeout=10)
+                response.raise_for_status()
+                data = response.json()
             books = []
             
             if 'items' in data:
                 for item in data['items']:
-                    volume_info = item.get('volumeInfo', {})
-                    book = {
-                        'title': volume_info.get('title', 'N/A'),
-                        'author': ', '.join(volume_info.get('authors', ['Unknown'])),
-                        'publication_year': self._extract_year(volume_info.get('publishedDate', '')),
-                        'isbn': self._extract_isbn(volume_info.get('industryIdentifiers', []))
-                    }
-                    books.append(book)
+                    books.append(self._parse_volume(item))
                     
             print(f"✓ Fetched {len(books)} books from API")
             return books
             
-        except requests.exceptions.RequestException as e:
+        except Exception as e:
+            # Imported here rather than up front so a fresh cache hit never loads requests
+            import requests
+            
+            if not isinstance(e, requests.exceptions.RequestException):
+                raise
             print(f"✗ Error fetching data from API: {e}")
             return []
     
+    def _parse_volume(self, item):
+        """Convert one item of a volumes response into a book dict"""
+        volume_info = item.get('volumeInfo', {})
+        return {
+            'title': volume_info.get('title', 'N/A'),
+            'author': ', '.join(volume_info.get('authors', ['Unknown'])),
+            'publication_year': self._extract_year(volume_info.get('publishedDate', '')),
+            'isbn': self._extract_isbn(volume_info.get('industryIdentifiers', []))
+        }
+    
+    def _get_session(self, pool_size):
+        """Create (once) a pooled requests.Session shared by ingestion workers"""
+        import requests
+        
+        if self.session is None:
+            self.session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size,
+                                                    pool_maxsize=pool_size)
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
+        return self.session
+    
+    def _fetch_page(self, session, limiter, query, start_index, page_size,
+                    max_retries=5, backoff=0.5, timeout=10):
+        """
+        Fetch one volumes page, retrying 429/5xx and connection errors with
+        exponential backoff (or the server's Retry-After). Returns (data, latencies).
+        """
+        import requests
+        
+        params = {'q': query, 'startIndex': start_index, 'maxResults': page_size}
+        latencies = []
+        for attempt in range(max_retries + 1):
+            limiter.acquire()
+            started = time.perf_counter()
+            try:
+                response = session.get(self.api_url, params=params, timeout=timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                latencies.append(time.perf_counter() - started)
+                if attempt == max_retries:
+                    raise
+                time.sleep(backoff * 2 ** attempt * (1 + random.random()))
+                continue
+            latencies.append(time.perf_counter() - started)
+            
+            if response.status_code in RETRY_STATUSES and attempt < max_retries:
+                retry_after = response.headers.get('Retry-After', '')
+                delay = (float(retry_after) if retry_after.isdigit()
+                         else backoff * 2 ** attempt * (1 + random.random()))
+                time.sleep(delay)
+                continue
+            response.raise_for_status()
+            return response.json(), latencies
+    
+    def ingest_books(self, queries, max_pages=10, page_size=MAX_PAGE_SIZE, max_workers=8,
+                     requests_per_second=10.0, batch_size=500):
+        """
+        Harvest many queries x startIndex pages concurrently and stream the
+        results into store_books() in batches.
+        
+        The first page of each query reports totalItems, which decides how many
+        further pages (up to max_pages) are scheduled for it. queries may be any
+        iterable; it is consumed lazily and at most max_workers * 2 pages are in
+        flight, so scheduling cost does not grow with the number of queries.
+        """
+        import requests
+        
+        session = self._get_session(max_workers)
+        limiter = TokenBucket(requests_per_second)
+        latencies = []
+        batch = []
+        totals = {'queries': 0, 'pages': 0, 'books': 0, 'failed_pages': 0}
+        started = time.perf_counter()
+        
+        remaining = iter(queries)
+        follow_ups = deque()
+        
+        def next_page():
+            """Next (query, page) to fetch: known follow-up pages first, then new queries"""
+            if follow_ups:
+                return follow_ups.popleft()
+            query = next(remaining, None)
+            if query is None:
+                return None
+            totals['queries'] += 1
+            return query, 0
+        
+        print(f"Ingesting queries with {max_workers} workers "
+              f"at <= {requests_per_second:g} req/s...")
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            pending = {}
+            while True:
+                while len(pending) < max_workers * 2:
+                    work = next_page()
+                    if work is None:
+                        break
+                    query, page = work
+                    future = pool.submit(self._fetch_page, session, limiter, query,
+                                         page * page_size, page_size)
+                    pending[future] = work
+                if not pending:
+                    break
+                
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    query, page = pending.pop(future)
+                    try:
+                        data, page_latencies = future.result()
+                    except requests.exceptions.RequestException as e:
+                        totals['failed_pages'] += 1
+                        print(f"  ✗ '{query}' page {page}: {e}")
+                        continue
+                    
+                    latencies.extend(page_latencies)
+                    totals['pages'] += 1
+                    items = data.get('items', [])
+                    batch.extend(self._parse_volume(item) for item in items)
+                    
+                    if page == 0:
+                        total_items = data.get('totalItems', 0)
+                        pages = min(max_pages, -(-total_items // page_size))
+                        follow_ups.extend((query, later) for later in range(1, pages))
+                    
+                    if len(batch) >= batch_size:
+                        totals['books'] += len(batch)
+                        self.store_books(batch)
+                        batch = []
+        
+        if batch:
+            totals['books'] += len(batch)
+            self.store_books(batch)
+        
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        report = {
+            'queries': totals['queries'],
+            'pages': totals['pages'],
+            'failed_pages': totals['failed_pages'],
+            'books': totals['books'],
+            'elapsed': elapsed,
+            'pages_per_sec': totals['pages'] / elapsed if elapsed > 0 else 0.0,
+            'latency_p50': percentile(latencies, 0.50),
+            'latency_p95': percentile(latencies, 0.95),
+            'latency_p99': percentile(latencies, 0.99),
+            'latency_max': latencies[-1] if latencies else 0.0
+        }
+        print(f"✓ Ingested {report['books']} books from {report['pages']} pages "
+              f"of {report['queries']} queries "
+              f"in {elapsed:.2f}s ({report['pages_per_sec']:.1f} pages/sec)")
+        print(f"  Request latency p50 {report['latency_p50'] * 1000:.0f} ms, "
+              f"p95 {report['latency_p95'] * 1000:.0f} ms, "
+              f"p99 {report['latency_p99'] * 1000:.0f} ms")
+        if report['failed_pages']:
+            print(f"  ⚠ {report['failed_pages']} pages failed after retries")
+        return report
+    
     def _extract_year(self, date_string):
         """Extract year from date string"""
         if not date_string:
@@ -88,28 +607,102 @@ class BookAPIHandler:
             print("No books to store")
             return
         
-        for book in books:
-            self.cursor.execute('''
-                INSERT INTO books (title, author, publication_year, isbn)
-                VALUES (?, ?, ?, ?)
-            ''', (book['title'], book['author'], book['publication_year'], book['isbn']))
+        with self.db.transaction() as cursor:
+            cursor.execute('SELECT COALESCE(MAX(id), 0) FROM books')
+            last_id = cursor.fetchone()[0]
+            
+            # Upsert on book_key so re-fetched books refresh the row they already have
+            cursor.executemany('''
+                INSERT INTO books (title, author, publication_year, isbn, book_key)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (book_key) DO UPDATE SET
+                    title = excluded.title,
+                    author = excluded.author,
+                    publication_year = excluded.publication_year,
+                    isbn = excluded.isbn,
+                    fetched_at = CURRENT_TIMESTAMP
+            ''', [(book['title'], book['author'], book['publication_year'], book['isbn'],
+                   book_key(book['title'], book['author'], book['isbn'])) for book in books])
+            
+            cursor.execute('SELECT COUNT(*) FROM books WHERE id > ?', (last_id,))
+            new = cursor.fetchone()[0]
+        print(f"✓ Stored {len(books)} books in database ({new} new, {len(books) - new} already known)")
+    
+    BOOK_COLUMNS = ('id', 'title', 'author', 'publication_year', 'isbn', 'fetched_at')
+    
+    def books_page(self, limit=50, after=None):
+        """
+        One keyset page of books, newest publication_year first.
+        `after` is the (publication_year, id) of the last row already seen;
+        returns (rows, next_after), with next_after None on the last page.
+        Books without a year come after all dated ones, newest id first.
+        """
+        select = f"SELECT {', '.join(self.BOOK_COLUMNS)} FROM books"
+        # Each step is a single seek on idx_books_year (publication_year, rowid);
+        # the rest of the year is read before moving to older years
+        if after is None:
+            steps = [(f"{select} WHERE publication_year IS NOT NULL "
+                      f"ORDER BY publication_year DESC, id DESC LIMIT ?", ()),
+                     (f"{select} WHERE publication_year IS NULL ORDER BY id DESC LIMIT ?", ())]
+        elif after[0] is not None:
+            steps = [(f"{select} WHERE publication_year = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                      (after[0], after[1])),
+                     (f"{select} WHERE publication_year < ? "
+                      f"ORDER BY publication_year DESC, id DESC LIMIT ?", (after[0],)),
+                     (f"{select} WHERE publication_year IS NULL ORDER BY id DESC LIMIT ?", ())]
+        else:
+            steps = [(f"{select} WHERE publication_year IS NULL AND id < ? "
+                      f"ORDER BY id DESC LIMIT ?", (after[1],))]
         
-        self.conn.commit()
-        print(f"✓ Stored {len(books)} books in database")
+        rows = []
+        # Pooled read-only connection: not held up by an ingest's open transaction
+        with self.db.reader() as conn:
+            for query, params in steps:
+                remaining = limit - len(rows)
+                if remaining <= 0:
+                    break
+                rows += conn.execute(query, params + (remaining,)).fetchmany(remaining)
+        
+        next_after = (rows[-1][3], rows[-1][0]) if len(rows) == limit else None
+        return rows, next_after
     
-    def display_books(self):
-        """Retrieve and display all books from database"""
-        self.cursor.execute('SELECT * FROM books ORDER BY publication_year DESC')
-        books = self.cursor.fetchall()
+    def iter_books(self, page_size=500):
+        """Lazily yield every book in display order, one keyset page at a time"""
+        after = None
+        while True:
+            rows, after = self.books_page(page_size, after)
+            yield from rows
+            if after is None:
+                return
+    
+    def display_books(self, limit=None, output='text'):
+        """
+        Retrieve and display books from database
+        output: 'text' (one field per line), 'table' (one row per line) or 'jsonl'
+        Rows are printed as they are read and not kept; returns how many were shown.
+        """
+        if limit:
+            books, _ = self.books_page(limit)
+        else:
+            books = self.iter_books()
+        
+        shown = 0
+        if output == 'jsonl':
+            for book in books:
+                print(json.dumps(dict(zip(self.BOOK_COLUMNS, book))))
+                shown += 1
+            return shown
         
         print("\n" + "="*80)
         print("BOOKS IN DATABASE")
         print("="*80)
         
-        if not books:
-            print("No books found in database")
-        else:
-            for book in books:
+        for book in books:
+            if output == 'table':
+                year = book[3] if book[3] else 'N/A'
+                print(f"{book[0]:>7}  {year!s:>4}  {book[4] or 'N/A':<13}  "
+                      f"{book[1][:40]:<40}  {book[2][:30]}")
+            else:
                 print(f"\nID: {book[0]}")
                 print(f"Title: {book[1]}")
                 print(f"Author: {book[2]}")
@@ -117,36 +710,76 @@ class BookAPIHandler:
                 print(f"ISBN: {book[4] if book[4] else 'N/A'}")
                 print(f"Fetched: {book[5]}")
                 print("-" * 80)
+            shown += 1
+        
+        if not shown:
+            print("No books found in database")
         
-        return books
+        return shown
     
     def close(self):
         """Close database connection"""
-        if self.conn:
-            self.conn.close()
+        if self.session:
+            self.session.close()
+            self.session = None
+        if self.cache:
+            self.cache.close()
+        if self.db:
+            self.db.close()
+            self.db = self.conn = None
             print("\n✓ Database connection closed")
 
 def main():
     """Main execution function"""
-    handler = BookAPIHandler()
+    # Scheduled runs reuse cached responses instead of re-downloading them
+    handler = BookAPIHandler(cache=ResponseCache('books_http_cache.db'))
+    # Per-stage timings, enabled by PIPELINE_METRICS (see pipeline_metrics.py)
+    metrics = PipelineMetrics.from_env('books')
     
     try:
         # Step 1: Create database
-        handler.create_database()
+        with metrics.stage('create_database'):
+            handler.create_database()
         
         # Step 2: Fetch data from API
-        books = handler.fetch_books_from_api()
+        with metrics.stage('fetch') as stage:
+            books = handler.fetch_books_from_api()
+            stage.rows = len(books)
         
         # Step 3: Store in database
-        handler.store_books(books)
+        with metrics.stage('store') as stage:
+            handler.store_books(books)
+            stage.rows = len(books)
         
         # Step 4: Display data
-        handler.display_books()
+        with metrics.stage('display') as stage:
+            stage.rows = handler.display_books()
         
     except Exception as e:
         print(f"Error: {e}")
     finally:
         handler.close()
+        metrics.emit()
+
+def search_command(command, *args):
+    """
+    Search or re-index an existing books database from the command line:
+    --search TEXT [DB] or --rebuild-search [DB]
+    """
+    if command == '--search':
+        text, args = args[0], args[1:]
+    handler = BookAPIHandler(*args[:1])
+    try:
+        handler.create_database()
+        if command == '--rebuild-search':
+            handler.rebuild_search_index()
+        else:
+            handler.display_search(text)
+        return 0
+    finally:
+        handler.close()
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] in ('--search', '--rebuild-search'):
+        sys.exit(search_command(*sys.argv[1:4]))
     main()
\ No newline at end of file
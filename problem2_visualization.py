@@ -1,23 +1,549 @@
 
-import requests
-import matplotlib.pyplot as plt
+import csv
+import hashlib
 import json
-from statistics import mean, median, stdev
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+from array import array
+from statistics import mean, median, stdev, quantiles
 from collections import defaultdict
 
+from pipeline_metrics import PipelineMetrics
+
+# Percentiles reported per subject in addition to the median
+PERCENTILES = (10, 25, 75, 90)
+
+
+class StudentStore:
+    """
+    Compact, array-backed student records.
+    
+    Instead of one dict (plus a nested scores dict) per student, the store
+    keeps ids in array('I'), names as UTF-8 in one bytearray addressed by
+    array('Q') offsets, and scores row-major in array('B') with the subject
+    list as the column index. Indexing and iteration return the same
+    {'id', 'name', 'scores'} dicts existing callers expect, built on demand.
+    """
+    
+    def __init__(self, subjects):
+        self.subjects = list(subjects)
+        self.ids = array('I')
+        self.name_offsets = array('Q', [0])
+        self.name_blob = bytearray()
+        self.score_values = array('B')
+    
+    @classmethod
+    def from_arrays(cls, subjects, ids, name_offsets, name_blob, scores):
+        """Rebuild a store from the raw buffers written by export_results(.npz)"""
+        store = cls(subjects)
+        store.ids = array('I', bytes(ids))
+        store.name_offsets = array('Q', bytes(name_offsets))
+        store.name_blob = bytearray(name_blob)
+        store.score_values = array('B', bytes(scores))
+        return store
+    
+    @classmethod
+    def from_records(cls, students):
+        """Build a store from the list-of-dicts representation"""
+        students = list(students)
+        store = cls(students[0]['scores'] if students else [])
+        for student in students:
+            store.append(student['id'], student['name'],
+                         [student['scores'][subject] for subject in store.subjects])
+        return store
+    
+    def append(self, student_id, name, scores):
+        """Add one student; scores are given in self.subjects order, each 0-255"""
+        if len(scores) != len(self.subjects):
+            raise ValueError(f"Expected {len(self.subjects)} scores, got {len(scores)}")
+        self.ids.append(student_id)
+        self.name_blob += name.encode('utf-8')
+        self.name_offsets.append(len(self.name_blob))
+        self.score_values.extend(scores)
+    
+    def __len__(self):
+        return len(self.ids)
+    
+    def name(self, index):
+        return self.name_blob[self.name_offsets[index]:self.name_offsets[index + 1]].decode('utf-8')
+    
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('student index out of range')
+        width = len(self.subjects)
+        row = self.score_values[index * width:(index + 1) * width]
+        return {
+            'id': self.ids[index],
+            'name': self.name(index),
+            'scores': dict(zip(self.subjects, row))
+        }
+    
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+    
+    def score_matrix(self):
+        """
+        Zero-copy numpy uint8 view of the scores, shape (students, subjects).
+        The store cannot grow while a view is alive (array raises BufferError).
+        """
+        import numpy as np
+        
+        return np.frombuffer(self.score_values, dtype=np.uint8).reshape(len(self), len(self.subjects))
+    
+    def memory_report(self):
+        """Bytes used by each component, next to an estimate for the dict layout"""
+        report = {
+            'ids': self.ids.buffer_info()[1] * self.ids.itemsize,
+            'names': len(self.name_blob) + self.name_offsets.buffer_info()[1] * self.name_offsets.itemsize,
+            'scores': self.score_values.buffer_info()[1] * self.score_values.itemsize
+        }
+        report['total'] = sum(report.values())
+        if len(self):
+            # Deep size of one student in the dict layout, scaled to the cohort
+            sample = self[0]
+            per_student = (sys.getsizeof(sample) + sys.getsizeof(sample['id'])
+                           + sys.getsizeof(sample['name']) + sys.getsizeof(sample['scores'])
+                           + sum(sys.getsizeof(score) for score in sample['scores'].values()))
+            report['dict_layout_estimate'] = per_student * len(self)
+        return report
+
+class SubjectAccumulator:
+    """
+    Constant-memory, mergeable statistics for one subject.
+    
+    Mean and variance use Welford's update (Chan et al. when merging), min
+    and max are exact, and a 101-bin histogram over the 0-100 score range
+    gives the median and percentiles. For integer scores in range the
+    histogram holds every order statistic, so those are exact as well;
+    other values are rounded and clamped into the nearest bin.
+    """
+    
+    BINS = 101
+    
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.histogram = [0] * self.BINS
+    
+    def add(self, score):
+        self.count += 1
+        delta = score - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (score - self.mean)
+        if self.min is None or score < self.min:
+            self.min = score
+        if self.max is None or score > self.max:
+            self.max = score
+        self.histogram[min(self.BINS - 1, max(0, int(round(score))))] += 1
+    
+    def merge(self, other):
+        """Fold another accumulator (e.g. from another shard) into this one"""
+        if not other.count:
+            return self
+        if not self.count:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            self.histogram = list(other.histogram)
+            return self
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+        return self
+    
+    def _order_statistic(self, k):
+        """k-th smallest (0-based) score according to the histogram"""
+        seen = 0
+        for value, count in enumerate(self.histogram):
+            seen += count
+            if seen > k:
+                return value
+        return self.BINS - 1
+    
+    def percentile(self, p):
+        """Linearly interpolated percentile, matching numpy's default method"""
+        position = (self.count - 1) * p / 100
+        lower = math.floor(position)
+        low = self._order_statistic(lower)
+        if position == lower:
+            return float(low)
+        high = self._order_statistic(lower + 1)
+        return low + (position - lower) * (high - low)
+    
+    def result(self):
+        """Statistics in the same shape and rounding as calculate_statistics()"""
+        std_dev = math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+        return {
+            'average': round(self.mean, 2),
+            'median': round(self.percentile(50), 2),
+            'std_dev': round(std_dev, 2),
+            'min': self.min,
+            'max': self.max,
+            'percentiles': {f'p{p}': round(self.percentile(p), 2) for p in PERCENTILES}
+        }
+
+
+class ScoreAccumulator:
+    """Per-subject SubjectAccumulators for a stream of students; mergeable and picklable"""
+    
+    def __init__(self):
+        self.students = 0
+        self.subjects = {}
+    
+    def add_student(self, student):
+        self.students += 1
+        for subject, score in student['scores'].items():
+            accumulator = self.subjects.get(subject)
+            if accumulator is None:
+                accumulator = self.subjects[subject] = SubjectAccumulator()
+            accumulator.add(score)
+    
+    def add_students(self, students):
+        for student in students:
+            self.add_student(student)
+        return self
+    
+    def merge(self, other):
+        self.students += other.students
+        for subject, accumulator in other.subjects.items():
+            self.subjects.setdefault(subject, SubjectAccumulator()).merge(accumulator)
+        return self
+    
+    def result(self):
+        return {subject: accumulator.result() for subject, accumulator in self.subjects.items()}
+
+
+class RankingIndex:
+    """
+    Per-student query index over a students x subjects score matrix.
+    
+    Built once per cohort: for every subject (and for the total over all
+    subjects) a descending, stable argsort and a rank table of how many
+    students hold each score. Top-k per subject is then a slice, percentile
+    ranks for the whole cohort are one table lookup, and the correlation
+    matrix comes from sums and cross-products accumulated block by block.
+    Ties are always broken by student position (earlier students first).
+    """
+    
+    # Rows per block when accumulating cross-products for the correlations
+    BLOCK_ROWS = 1 << 20
+    OVERALL = None
+    
+    def __init__(self, subjects, scores, ids):
+        import numpy as np
+        
+        self.subjects = list(subjects)
+        self.columns = {subject: i for i, subject in enumerate(self.subjects)}
+        self.scores = scores
+        self.ids = np.asarray(ids)
+        self.count = len(scores)
+        
+        self.totals = scores.sum(axis=1, dtype=np.int32)
+        self.order = {}
+        self.rank_tables = {}
+        for i, subject in enumerate(self.subjects):
+            self.order[subject], self.rank_tables[subject] = self._index_column(scores[:, i])
+        self.order[self.OVERALL], self.rank_tables[self.OVERALL] = self._index_column(self.totals)
+        
+        # Positions of the ids in ascending order, for student lookups
+        self.id_order = np.argsort(self.ids, kind='stable')
+        self.sorted_ids = self.ids[self.id_order]
+        self.correlation = self._correlation()
+    
+    def _index_column(self, column):
+        """Descending stable argsort plus (low, below, equal) score-count tables"""
+        import numpy as np
+        
+        # int16 keys (scores are small) let numpy use its O(n) radix sort;
+        # the int32 totals fall back to a regular stable sort
+        small = column.dtype.itemsize == 1 or column.dtype == np.int16
+        keys = -column.astype(np.int16 if small else np.int64)
+        order = np.argsort(keys, kind='stable').astype(np.int32)
+        if not len(column):
+            return order, (0, np.zeros(1, np.int64), np.zeros(1, np.int64))
+        low = int(column.min())
+        equal = np.bincount(column.astype(np.int64) - low)
+        below = np.cumsum(equal) - equal
+        return order, (low, below, equal)
+    
+    def _correlation(self):
+        """Pearson correlation between subjects from blockwise sums and cross-products"""
+        import numpy as np
+        
+        width = len(self.subjects)
+        total = np.zeros(width)
+        cross = np.zeros((width, width))
+        for start in range(0, self.count, self.BLOCK_ROWS):
+            block = self.scores[start:start + self.BLOCK_ROWS].astype(np.float64)
+            total += block.sum(axis=0)
+            cross += block.T @ block
+        if self.count < 2:
+            return np.full((width, width), np.nan)
+        mean = total / self.count
+        covariance = cross / self.count - np.outer(mean, mean)
+        std = np.sqrt(np.clip(np.diag(covariance), 0, None))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return covariance / np.outer(std, std)
+    
+    def _values(self, subject):
+        if subject is self.OVERALL:
+            return self.totals
+        if subject not in self.columns:
+            raise KeyError(f"Unknown subject: {subject!r}")
+        return self.scores[:, self.columns[subject]]
+    
+    def top(self, k=10, subject=None, weights=None):
+        """
+        Positions and scores of the k best students: by one subject, by a
+        weighted composite ({subject: weight}) or, by default, by average.
+        """
+        import numpy as np
+        
+        k = max(0, min(k, self.count))
+        if weights is None:
+            order = self.order[subject][:k]
+            values = self._values(subject)[order]
+            if subject is self.OVERALL:
+                values = values / max(len(self.subjects), 1)
+            return order, values
+        
+        composite = np.zeros(self.count)
+        for name, weight in weights.items():
+            composite += weight * self._values(name)
+        if k < self.count:
+            # O(n) selection of the k-th best, then sort only the candidates
+            threshold = np.partition(composite, self.count - k)[self.count - k]
+            candidates = np.flatnonzero(composite >= threshold)
+        else:
+            candidates = np.arange(self.count)
+        order = candidates[np.lexsort((candidates, -composite[candidates]))][:k]
+        return order, composite[order]
+    
+    def percentile_ranks(self, subject=None):
+        """
+        Percentile rank of every student (share of the cohort scoring lower,
+        counting ties as half), in a subject or overall, as float32.
+        """
+        import numpy as np
+        
+        low, below, equal = self.rank_tables[subject]
+        table = ((below + 0.5 * equal) * (100.0 / max(self.count, 1))).astype(np.float32)
+        return table[self._values(subject).astype(np.int64) - low]
+    
+    def percentile_matrix(self):
+        """students x (subjects + overall) matrix of percentile ranks"""
+        import numpy as np
+        
+        return np.column_stack([self.percentile_ranks(subject)
+                                for subject in self.subjects + [self.OVERALL]])
+    
+    def position(self, student_id):
+        """Row of a student id in the score matrix, or None"""
+        import numpy as np
+        
+        slot = int(np.searchsorted(self.sorted_ids, student_id))
+        if slot < self.count and self.sorted_ids[slot] == student_id:
+            return int(self.id_order[slot])
+        return None
+    
+    def student_percentiles(self, position):
+        """Percentile ranks of one student, per subject and overall"""
+        ranks = {}
+        for subject in self.subjects + [self.OVERALL]:
+            low, below, equal = self.rank_tables[subject]
+            value = int(self._values(subject)[position]) - low
+            ranks[subject or 'overall'] = float((below[value] + 0.5 * equal[value]) * 100.0 / self.count)
+        return ranks
+    
+    def below(self, threshold, subjects=None):
+        """Sorted positions of students scoring below threshold in any of the subjects"""
+        import numpy as np
+        
+        hits = np.zeros(self.count, dtype=bool)
+        for subject in subjects or self.subjects:
+            low, below, equal = self.rank_tables[subject]
+            # Students under the threshold are the tail of the descending order
+            cut = min(max(math.ceil(threshold) - low, 0), len(below))
+            under = int(below[cut]) if cut < len(below) else self.count
+            if under:
+                hits[self.order[subject][self.count - under:]] = True
+        return np.flatnonzero(hits)
+
+
+# Bump when the report layout changes so cached renders are not reused
+RENDER_VERSION = 1
+
+
+class RenderCache:
+    """
+    Content-addressed, size-bounded disk cache of rendered reports.
+    
+    The key is a SHA-256 over the canonical JSON of the stats plus the
+    rendering parameters and RENDER_VERSION, so identical inputs map to the
+    same file and a hit needs no matplotlib work at all. Each image has a
+    small .json sidecar recording how long it took to render, which is what
+    a hit reports as time saved. Least recently used files go first once the
+    directory exceeds max_bytes.
+    """
+    
+    def __init__(self, directory='.render_cache', max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+        os.makedirs(directory, exist_ok=True)
+    
+    def key(self, stats, **params):
+        payload = json.dumps({'stats': stats, 'params': params, 'version': RENDER_VERSION},
+                             sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _paths(self, key, fmt):
+        base = os.path.join(self.directory, key)
+        return f'{base}.{fmt}', f'{base}.json'
+    
+    @staticmethod
+    def _copy(source, destination):
+        """
+        Copy via a temporary file in the destination directory and rename it
+        into place, so readers never see a half-written image
+        """
+        fd, partial = tempfile.mkstemp(dir=os.path.dirname(destination) or '.', suffix='.tmp')
+        os.close(fd)
+        try:
+            shutil.copyfile(source, partial)
+            os.replace(partial, destination)
+        except BaseException:
+            os.remove(partial)
+            raise
+    
+    def fetch(self, key, fmt, destination):
+        """Copy a cached render to destination; returns False on a miss"""
+        image, meta = self._paths(key, fmt)
+        try:
+            self._copy(image, destination)
+        except FileNotFoundError:
+            self.misses += 1
+            return False
+        os.utime(image)  # mark as recently used for eviction
+        self.hits += 1
+        try:
+            with open(meta) as f:
+                self.seconds_saved += json.load(f)['render_seconds']
+        except (OSError, ValueError, KeyError):
+            pass
+        return True
+    
+    def store(self, key, fmt, source, render_seconds):
+        image, meta = self._paths(key, fmt)
+        self._copy(source, image)
+        fd, partial = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'render_seconds': render_seconds}, f)
+        os.replace(partial, meta)
+        self._evict()
+    
+    def _evict(self):
+        images = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            # .tmp files are copies still being written by another process
+            if entry.is_file() and not entry.name.endswith(('.json', '.tmp')):
+                stat = entry.stat()
+                images.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        for _, size, path in sorted(images):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            meta = os.path.splitext(path)[0] + '.json'
+            if os.path.exists(meta):
+                os.remove(meta)
+            total -= size
+    
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'seconds_saved': self.seconds_saved}
+
+
+# File types the sharded runner understands, one partition (school/region) per file
+SHARD_EXTENSIONS = ('.jsonl', '.csv')
+
+
+def iter_shard_students(path):
+    """
+    Stream students from one partition file.
+    .jsonl: one {"id", "name", "scores": {...}} object per line
+    .csv:   id,name,<subject>,<subject>,... with one student per row
+    """
+    if path.endswith('.jsonl'):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                student_id = row.pop('id', None)
+                name = row.pop('name', '')
+                yield {'id': int(student_id) if student_id else None, 'name': name,
+                       'scores': {subject: int(score) for subject, score in row.items() if score}}
+
+
+def _analyze_shard(path):
+    """Worker: accumulate one partition file, returning (partition, accumulator, seconds)"""
+    started = time.perf_counter()
+    accumulator = ScoreAccumulator().add_students(iter_shard_students(path))
+    # Keyed by the full file name so school_000.csv and school_000.jsonl stay apart
+    return os.path.basename(path), accumulator, time.perf_counter() - started
+
+
 class StudentScoreAnalyzer:
     def __init__(self):
         self.student_data = []
+        # Columnar copy of the scores (students x subjects) for the numpy backend
+        self.subjects = None
+        self.scores = None
+        # Set when statistics come from a stream rather than student_data
+        self.accumulator = None
+        # RankingIndex over the score matrix, built on the first per-student query
+        self.ranking = None
+        # Optional RenderCache consulted before any headless render
+        self.render_cache = None
+        # Figure, axes and layout reused across headless renders
+        self._headless_figure = None
+        self._headless_axes = None
+        self._headless_layout = None
         
-    def fetch_student_data(self):
+    def fetch_student_data(self, compact=False):
         """
         Fetch student data from API
         Using JSONPlaceholder as mock API with simulated student scores
+        compact=True keeps the records in a StudentStore instead of dicts
         """
         try:
             # Mock student data (in real scenario, use actual API)
             # For demonstration, creating synthetic data
-            self.student_data = self._generate_mock_data()
+            self.student_data = self._generate_mock_data(compact=compact)
+            self.subjects = self.scores = None
+            self.ranking = None
             
             print(f"✓ Fetched data for {len(self.student_data)} students")
             return self.student_data
@@ -26,14 +552,22 @@ class StudentScoreAnalyzer:
             print(f"✗ Error fetching data: {e}")
             return []
     
-    def _generate_mock_data(self):
+    def _generate_mock_data(self, count=20, compact=False):
         """Generate mock student data for demonstration"""
         import random
         
         subjects = ['Math', 'Science', 'English', 'History', 'Geography']
+        
+        if compact:
+            store = StudentStore(subjects)
+            for i in range(count):
+                store.append(i + 1, f'Student {i + 1}',
+                             [random.randint(60, 100) for _ in subjects])
+            return store
+        
         students = []
         
-        for i in range(20):
+        for i in range(count):
             student = {
                 'id': i + 1,
                 'name': f'Student {i + 1}',
@@ -45,12 +579,25 @@ class StudentScoreAnalyzer:
         
         return students
     
-    def calculate_statistics(self):
-        """Calculate various statistics from student data"""
+    def calculate_statistics(self, backend='python'):
+        """
+        Calculate various statistics from student data
+        backend: 'python' (statistics module), 'numpy' (one vectorised pass
+        over a students x subjects matrix) or 'streaming' (constant-memory
+        accumulators); all return the same structure, with std_dev 0.0 for a
+        subject scored by fewer than two students.
+        """
         if not self.student_data:
             print("No data available")
             return None
         
+        if backend == 'numpy':
+            return self._calculate_statistics_numpy()
+        if backend == 'streaming':
+            return ScoreAccumulator().add_students(self.student_data).result()
+        if backend != 'python':
+            raise ValueError(f"Unknown statistics backend: {backend!r}")
+        
         # Calculate average scores per subject
         subject_scores = defaultdict(list)
         
@@ -63,13 +610,153 @@ class StudentScoreAnalyzer:
             statistics[subject] = {
                 'average': round(mean(scores), 2),
                 'median': round(median(scores), 2),
-                'std_dev': round(stdev(scores), 2),
+                'std_dev': round(stdev(scores), 2) if len(scores) > 1 else 0.0,
                 'min': min(scores),
-                'max': max(scores)
+                'max': max(scores),
+                'percentiles': self._percentiles(scores)
             }
         
         return statistics
     
+    def _percentiles(self, scores):
+        """PERCENTILES of one subject, linearly interpolated like numpy's default"""
+        if len(scores) < 2:
+            return {f'p{p}': round(float(scores[0]), 2) for p in PERCENTILES}
+        cuts = quantiles(scores, n=100, method='inclusive')
+        return {f'p{p}': round(cuts[p - 1], 2) for p in PERCENTILES}
+    
+    def load_score_matrix(self):
+        """Build (once) the students x subjects score matrix from student_data"""
+        import numpy as np
+        
+        if self.scores is None and isinstance(self.student_data, StudentStore):
+            self.subjects = self.student_data.subjects
+            self.scores = self.student_data.score_matrix()
+        elif self.scores is None:
+            subjects = list(self.student_data[0]['scores'])
+            try:
+                flat = np.fromiter((student['scores'][subject]
+                                    for student in self.student_data for subject in subjects),
+                                   dtype=np.int16, count=len(self.student_data) * len(subjects))
+            except KeyError as e:
+                raise ValueError(f"Every student needs a score for every subject (missing {e})")
+            self.subjects = subjects
+            self.scores = flat.reshape(len(self.student_data), len(subjects))
+        return self.subjects, self.scores
+    
+    def _calculate_statistics_numpy(self):
+        """All per-subject statistics from one pass over the score matrix"""
+        import numpy as np
+        
+        subjects, scores = self.load_score_matrix()
+        averages = scores.mean(axis=0, dtype=np.float64)
+        if len(scores) > 1:
+            std_devs = scores.std(axis=0, dtype=np.float64, ddof=1)
+        else:
+            std_devs = np.zeros(len(subjects))  # ddof=1 is undefined (NaN) for one student
+        # min, the percentiles, median and max from a single partition per column
+        levels = (0, *PERCENTILES[:2], 50, *PERCENTILES[2:], 100)
+        cuts = np.percentile(scores, levels, axis=0)
+        by_level = dict(zip(levels, cuts))
+        
+        statistics = {}
+        for i, subject in enumerate(subjects):
+            statistics[subject] = {
+                'average': round(float(averages[i]), 2),
+                'median': round(float(by_level[50][i]), 2),
+                'std_dev': round(float(std_devs[i]), 2),
+                'min': int(by_level[0][i]),
+                'max': int(by_level[100][i]),
+                'percentiles': {f'p{p}': round(float(by_level[p][i]), 2) for p in PERCENTILES}
+            }
+        return statistics
+    
+    def build_ranking_index(self):
+        """Build (once) the RankingIndex behind the per-student queries"""
+        if self.ranking is None:
+            subjects, scores = self.load_score_matrix()
+            if isinstance(self.student_data, StudentStore):
+                ids = self.student_data.ids
+            else:
+                ids = [student['id'] for student in self.student_data]
+            started = time.perf_counter()
+            self.ranking = RankingIndex(subjects, scores, ids)
+            print(f"✓ Ranking index built for {self.ranking.count:,} students "
+                  f"in {time.perf_counter() - started:.2f}s")
+        return self.ranking
+    
+    def _student_name(self, position):
+        if isinstance(self.student_data, StudentStore):
+            return self.student_data.name(position)
+        return self.student_data[position]['name']
+    
+    def top_students(self, k=10, subject=None, weights=None):
+        """
+        The k best students by one subject, by a weighted composite
+        ({subject: weight}) or, by default, by their average score.
+        Returns [{'rank', 'id', 'name', 'score'}, ...].
+        """
+        ranking = self.build_ranking_index()
+        positions, values = ranking.top(k, subject, weights)
+        return [{'rank': rank, 'id': int(ranking.ids[position]),
+                 'name': self._student_name(position), 'score': round(float(value), 2)}
+                for rank, (position, value) in enumerate(zip(positions, values), start=1)]
+    
+    def percentile_ranks(self, subject=None):
+        """Percentile rank of every student (in student_data order), per subject or overall"""
+        return self.build_ranking_index().percentile_ranks(subject)
+    
+    def student_percentiles(self, student_id):
+        """{subject: percentile rank, ..., 'overall': ...} for one student, or None"""
+        ranking = self.build_ranking_index()
+        position = ranking.position(student_id)
+        if position is None:
+            return None
+        return {subject: round(rank, 2)
+                for subject, rank in ranking.student_percentiles(position).items()}
+    
+    def students_below(self, threshold, subjects=None):
+        """Students scoring below threshold in any of the subjects (all by default)"""
+        ranking = self.build_ranking_index()
+        return [self.student_data[int(position)] for position in ranking.below(threshold, subjects)]
+    
+    def correlation_matrix(self):
+        """Pearson correlations between subjects as {subject: {subject: r}}"""
+        ranking = self.build_ranking_index()
+        return {row: {column: (None if math.isnan(value) else round(float(value), 4))
+                      for column, value in zip(ranking.subjects, values)}
+                for row, values in zip(ranking.subjects, ranking.correlation)}
+    
+    def ranking_summary(self, top_k=10):
+        """Top students overall and per subject plus the correlations, for export"""
+        ranking = self.build_ranking_index()
+        return {
+            'top_overall': self.top_students(top_k),
+            'top_by_subject': {subject: self.top_students(top_k, subject)
+                               for subject in ranking.subjects},
+            'correlation': self.correlation_matrix()
+        }
+    
+    def display_rankings(self, top_k=5):
+        """Display the top students and the subject correlations"""
+        if not self.student_data:
+            return
+        summary = self.ranking_summary(top_k)
+        
+        print("\n" + "="*80)
+        print(f"TOP {top_k} STUDENTS (average score)")
+        print("="*80)
+        for student in summary['top_overall']:
+            print(f"  {student['rank']:>3}. {student['name']:<24} {student['score']:>6}")
+        
+        print("\nSubject correlations:")
+        subjects = list(summary['correlation'])
+        print(" " * 12 + "".join(f"{subject[:9]:>10}" for subject in subjects))
+        for subject, row in summary['correlation'].items():
+            cells = "".join(f"{row[other]:>10.2f}" if row[other] is not None else f"{'n/a':>10}"
+                            for other in subjects)
+            print(f"{subject[:12]:<12}{cells}")
+    
     def display_statistics(self, stats):
         """Display calculated statistics"""
         if not stats:
@@ -85,15 +772,139 @@ class StudentScoreAnalyzer:
             print(f"  Median: {metrics['median']}")
             print(f"  Std Dev: {metrics['std_dev']}")
             print(f"  Range: {metrics['min']} - {metrics['max']}")
+            if metrics.get('percentiles'):
+                print("  Percentiles: " + ", ".join(
+                    f"{name} {value}" for name, value in metrics['percentiles'].items()))
     
-    def create_visualizations(self, stats):
-        """Create bar charts and other visualizations"""
+    def create_visualizations(self, stats, headless=False, filename='student_scores_analysis.png',
+                              dpi=300, fmt=None):
+        """
+        Create bar charts and other visualizations
+        headless=True renders on the Agg canvas without pyplot or show(), draws
+        the box plot from the precomputed quartiles and reuses one figure.
+        """
         if not stats:
             print("No statistics to visualize")
             return
         
+        if headless:
+            self._render_headless(stats, filename, dpi, fmt)
+            print(f"\n✓ Visualization saved as '{filename}'")
+            return filename
+        
+        # pyplot (and its GUI backend probing) is only loaded for interactive runs
+        import matplotlib.pyplot as plt
+        
         # Create figure with subplots
-        fig, axes = plt.subplots(2, 2, figsize=(15, 10))
+        fig = plt.figure(figsize=(15, 10))
+        self._draw_figure(fig, stats, self._score_columns(list(stats.keys())))
+        fig.tight_layout()
+        
+        plt.savefig(filename, dpi=dpi, bbox_inches='tight', format=fmt)
+        print(f"\n✓ Visualization saved as '{filename}'")
+        plt.show()
+        return filename
+    
+    def render_cohorts(self, cohorts, output_dir='.', dpi=100, fmt='png'):
+        """Render many {cohort name: stats} reports headlessly on one reused figure"""
+        os.makedirs(output_dir, exist_ok=True)
+        started = time.perf_counter()
+        paths = []
+        for name, stats in cohorts.items():
+            path = os.path.join(output_dir, f'{name}.{fmt}')
+            self._render_headless(stats, path, dpi, fmt)
+            paths.append(path)
+        elapsed = time.perf_counter() - started
+        print(f"✓ Rendered {len(paths)} cohort reports to '{output_dir}' in {elapsed:.2f}s "
+              f"({elapsed / max(len(paths), 1) * 1000:.0f} ms each)")
+        if self.render_cache:
+            cache = self.render_cache.stats()
+            print(f"  Render cache: {cache['hits']} hits, {cache['misses']} misses "
+                  f"({cache['hit_rate']:.0%} hit rate), ~{cache['seconds_saved']:.1f}s saved")
+        return paths
+    
+    def _render_headless(self, stats, filename, dpi, fmt):
+        """Serve the render from self.render_cache when possible, else draw it"""
+        if self.render_cache is None:
+            self._draw_headless(stats, filename, dpi, fmt)
+            return
+        
+        fmt = fmt or os.path.splitext(filename)[1].lstrip('.') or 'png'
+        key = self.render_cache.key(stats, dpi=dpi, fmt=fmt, figsize=(15, 10))
+        if self.render_cache.fetch(key, fmt, filename):
+            return
+        render_seconds = self._draw_headless(stats, filename, dpi, fmt)
+        self.render_cache.store(key, fmt, filename, render_seconds)
+    
+    def _draw_headless(self, stats, filename, dpi, fmt):
+        """
+        Draw and save the report; returns the seconds spent drawing and saving,
+        leaving out the one-off matplotlib import and figure setup
+        """
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        
+        if self._headless_figure is None:
+            self._headless_figure = Figure(figsize=(15, 10))
+            FigureCanvasAgg(self._headless_figure)
+        fig = self._headless_figure
+        started = time.perf_counter()
+        self._headless_axes = self._draw_figure(fig, stats, axes=self._headless_axes)
+        
+        # Layout only depends on the subject labels; recompute it when they change
+        # and then detach the layout engine so savefig() does not draw twice
+        if self._headless_layout != tuple(stats):
+            fig.tight_layout()
+            fig.set_layout_engine(None)
+            self._headless_layout = tuple(stats)
+        fig.savefig(filename, dpi=dpi, format=fmt)
+        return time.perf_counter() - started
+    
+    def _score_columns(self, subjects):
+        """Raw per-subject score sequences for the data-driven box plot"""
+        if self.scores is not None:
+            # Reuse the columnar scores instead of rebuilding per-subject lists
+            columns = {subject: i for i, subject in enumerate(self.subjects)}
+            return [self.scores[:, columns[subject]] for subject in subjects]
+        score_data = []
+        for subject in subjects:
+            subject_scores = [s['scores'][subject] for s in self.student_data]
+            score_data.append(subject_scores)
+        return score_data
+    
+    def _box_stats(self, stats):
+        """
+        Box plot summaries for Axes.bxp from the statistics alone. Whiskers
+        follow the 1.5 x IQR rule clamped to min/max; min or max beyond a
+        whisker is drawn as the only flier, since other outliers need raw data.
+        """
+        boxes = []
+        for subject, metrics in stats.items():
+            percentiles = metrics.get('percentiles') or {}
+            q1 = percentiles.get('p25', metrics['median'])
+            q3 = percentiles.get('p75', metrics['median'])
+            whislo = max(metrics['min'], q1 - 1.5 * (q3 - q1))
+            whishi = min(metrics['max'], q3 + 1.5 * (q3 - q1))
+            boxes.append({
+                'label': subject,
+                'med': metrics['median'],
+                'q1': q1,
+                'q3': q3,
+                'whislo': whislo,
+                'whishi': whishi,
+                'fliers': [value for value in (metrics['min'], metrics['max'])
+                           if value < whislo or value > whishi]
+            })
+        return boxes
+    
+    def _draw_figure(self, fig, stats, box_data=None, axes=None):
+        """Draw the four-panel report onto fig, clearing and reusing axes if given"""
+        if axes is None:
+            fig.clf()
+            axes = fig.subplots(2, 2)
+        else:
+            for ax in axes.flat:
+                ax.cla()
         fig.suptitle('Student Score Analysis', fontsize=16, fontweight='bold')
         
         subjects = list(stats.keys())
@@ -146,12 +957,10 @@ class StudentScoreAnalyzer:
         
         # 4. Score Distribution Box Plot
         ax4 = axes[1, 1]
-        score_data = []
-        for subject in subjects:
-            subject_scores = [s['scores'][subject] for s in self.student_data]
-            score_data.append(subject_scores)
-        
-        bp = ax4.boxplot(score_data, labels=subjects, patch_artist=True)
+        if box_data is not None:
+            bp = ax4.boxplot(box_data, labels=subjects, patch_artist=True)
+        else:
+            bp = ax4.bxp(self._box_stats(stats), patch_artist=True)
         for patch in bp['boxes']:
             patch.set_facecolor('lightblue')
             patch.set_alpha(0.7)
@@ -159,46 +968,277 @@ class StudentScoreAnalyzer:
         ax4.set_title('Score Distribution by Subject', fontweight='bold')
         ax4.set_ylabel('Score')
         ax4.grid(axis='y', alpha=0.3)
-        
-        plt.tight_layout()
-        plt.savefig('student_scores_analysis.png', dpi=300, bbox_inches='tight')
-        print("\n✓ Visualization saved as 'student_scores_analysis.png'")
-        plt.show()
+        return axes
+    
+    def analyze_stream(self, students, accumulator=None):
+        """
+        Consume an iterable of students without keeping them, optionally on top
+        of partial results (e.g. merged from other shards), and return statistics.
+        """
+        self.accumulator = (accumulator or ScoreAccumulator()).add_students(students)
+        print(f"✓ Streamed scores for {self.accumulator.students} students")
+        return self.accumulator.result()
+    
+    def merge_accumulators(self, accumulators):
+        """Combine partial accumulators from several shards or processes"""
+        merged = ScoreAccumulator()
+        for accumulator in accumulators:
+            merged.merge(accumulator)
+        self.accumulator = merged
+        return merged.result()
+    
+    def memory_report(self):
+        """Print and return how much memory the loaded student records use"""
+        if not isinstance(self.student_data, StudentStore):
+            print("Memory report is available for compact (StudentStore) data only")
+            return None
+        report = self.student_data.memory_report()
+        count = max(len(self.student_data), 1)
+        print(f"Student store: {report['total']:,} bytes for {len(self.student_data):,} students "
+              f"({report['total'] / count:.1f} bytes/student)")
+        print(f"  ids {report['ids']:,} B, names {report['names']:,} B, scores {report['scores']:,} B")
+        if 'dict_layout_estimate' in report:
+            print(f"  dict layout estimate: {report['dict_layout_estimate']:,} bytes "
+                  f"({report['dict_layout_estimate'] / max(report['total'], 1):.1f}x larger)")
+        return report
     
-    def export_results(self, stats):
-        """Export results to JSON file"""
-        output = {
-            'total_students': len(self.student_data),
-            'statistics': stats,
-            'student_data': self.student_data
+    def analyze_shards(self, directory, workers=None, output=None):
+        """
+        Analyse every partition file in a directory in a process pool and
+        reduce the per-shard accumulators into global and per-partition stats,
+        keyed by file name. With output, the results also go through
+        export_results(). Returns (global_stats, partition_stats, timings).
+        """
+        paths = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                       if name.endswith(SHARD_EXTENSIONS))
+        if not paths:
+            print(f"✗ No {' / '.join(SHARD_EXTENSIONS)} shards found in '{directory}'")
+            return None, {}, {}
+        
+        from concurrent.futures import ProcessPoolExecutor
+        
+        workers = workers or os.cpu_count() or 1
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # chunksize > 1 amortises IPC when there are many small shards
+            results = list(pool.map(_analyze_shard, paths,
+                                    chunksize=max(1, len(paths) // (workers * 4))))
+        map_seconds = time.perf_counter() - started
+        
+        reduce_started = time.perf_counter()
+        partitions = {partition: accumulator.result() for partition, accumulator, _ in results}
+        stats = self.merge_accumulators(accumulator for _, accumulator, _ in results)
+        reduce_seconds = time.perf_counter() - reduce_started
+        
+        timings = {
+            'shards': len(paths),
+            'workers': workers,
+            'students': self.accumulator.students,
+            'map_seconds': map_seconds,
+            'reduce_seconds': reduce_seconds,
+            'shard_seconds': sum(seconds for _, _, seconds in results),
+            'shards_per_sec': len(paths) / map_seconds if map_seconds > 0 else 0.0,
+            'students_per_sec': self.accumulator.students / map_seconds if map_seconds > 0 else 0.0
         }
+        print(f"✓ Analysed {timings['students']:,} students in {len(paths)} shards on "
+              f"{workers} workers ({timings['shards_per_sec']:.1f} shards/sec, "
+              f"{timings['students_per_sec']:,.0f} students/sec, reduce {reduce_seconds * 1000:.1f} ms)")
+        if output:
+            self.export_results(stats, output, partitions=partitions)
+        return stats, partitions, timings
+    
+    def export_results(self, stats, filename='student_analysis_results.json', partitions=None,
+                       top_k=None):
+        """
+        Export results to a file; the format follows the extension:
+        .json  - one pretty-printed document (the original format)
+        .jsonl - a header line with the statistics, then one student per line,
+                 written as they are iterated so nothing is built up in memory
+        .npz   - columnar NumPy arrays (ids, uint8 scores, UTF-8 names) that
+                 load_results() reads back without any JSON parsing
+        top_k adds a 'rankings' section (ranking_summary()); .npz files then
+        also carry every student's percentile ranks.
+        """
+        total_students = len(self.student_data)
+        if not total_students and self.accumulator:
+            total_students = self.accumulator.students
+        header = {'total_students': total_students, 'statistics': stats}
+        if partitions is not None:
+            header['partitions'] = partitions
+        rankings = None
+        if top_k and self.student_data:
+            rankings = header['rankings'] = self.ranking_summary(top_k)
         
-        with open('student_analysis_results.json', 'w') as f:
-            json.dump(output, f, indent=2)
+        if filename.endswith('.jsonl'):
+            with open(filename, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(header) + '\n')
+                encode = json.JSONEncoder(separators=(',', ':')).encode
+                if isinstance(self.student_data, StudentStore):
+                    # Format rows straight from the arrays instead of via per-student dicts
+                    store = self.student_data
+                    width = len(store.subjects)
+                    # Subject names are literal text in the template, so escape their braces
+                    keys = [encode(subject).replace('{', '{{').replace('}', '}}')
+                            for subject in store.subjects]
+                    template = ('{{"id":{},"name":{},"scores":{{'
+                                + ','.join(f'{key}:{{}}' for key in keys)
+                                + '}}}}\n')
+                    for index in range(len(store)):
+                        f.write(template.format(store.ids[index], encode(store.name(index)),
+                                                *store.score_values[index * width:(index + 1) * width]))
+                else:
+                    for student in self.student_data:
+                        f.write(encode(student))
+                        f.write('\n')
+        elif filename.endswith('.npz'):
+            import numpy as np
+            
+            store = self.student_data
+            if not isinstance(store, StudentStore):
+                store = StudentStore.from_records(store)
+            extra = {}
+            if rankings is not None:
+                # Columns follow 'subjects', then the overall rank
+                extra['percentile_ranks'] = self.ranking.percentile_matrix()
+            np.savez(filename,
+                     header=np.array(json.dumps(header)),
+                     subjects=np.array(store.subjects),
+                     ids=np.frombuffer(store.ids, dtype=np.uint32),
+                     name_offsets=np.frombuffer(store.name_offsets, dtype=np.uint64),
+                     name_blob=np.frombuffer(bytes(store.name_blob), dtype=np.uint8),
+                     scores=store.score_matrix() if len(store) else np.zeros((0, len(store.subjects)), np.uint8),
+                     **extra)
+        else:
+            output = {
+                'total_students': total_students,
+                'statistics': stats,
+                'student_data': list(self.student_data)
+            }
+            if partitions is not None:
+                output['partitions'] = partitions
+            if rankings is not None:
+                output['rankings'] = rankings
+            with open(filename, 'w') as f:
+                json.dump(output, f, indent=2)
         
-        print("✓ Results exported to 'student_analysis_results.json'")
+        print(f"✓ Results exported to '{filename}'")
+    
+    @classmethod
+    def load_results(cls, filename):
+        """
+        Rehydrate an analyzer from any export_results() file.
+        Students come back as a compact StudentStore; returns (analyzer, header)
+        where header holds total_students, statistics and any partitions.
+        """
+        analyzer = cls()
+        if filename.endswith('.npz'):
+            import numpy as np
+            
+            with np.load(filename) as data:
+                header = json.loads(str(data['header']))
+                analyzer.student_data = StudentStore.from_arrays(
+                    [str(subject) for subject in data['subjects']], data['ids'],
+                    data['name_offsets'], data['name_blob'], data['scores'])
+        elif filename.endswith('.jsonl'):
+            with open(filename, encoding='utf-8') as f:
+                header = json.loads(f.readline())
+                store = None
+                for line in f:
+                    student = json.loads(line)
+                    if store is None:
+                        store = StudentStore(student['scores'])
+                    store.append(student['id'], student['name'],
+                                 [student['scores'][subject] for subject in store.subjects])
+                analyzer.student_data = store or []
+        else:
+            with open(filename) as f:
+                header = json.load(f)
+            students = header.pop('student_data', [])
+            analyzer.student_data = StudentStore.from_records(students) if students else []
+        return analyzer, header
+
+def write_mock_shards(directory, shards=8, students_per_shard=10000, fmt='jsonl'):
+    """Write synthetic partition files (one per school) for the sharded runner"""
+    import random
+    
+    subjects = ['Math', 'Science', 'English', 'History', 'Geography']
+    os.makedirs(directory, exist_ok=True)
+    next_id = 1
+    for shard in range(shards):
+        path = os.path.join(directory, f'school_{shard:03d}.{fmt}')
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f) if fmt == 'csv' else None
+            if writer:
+                writer.writerow(['id', 'name'] + subjects)
+            for _ in range(students_per_shard):
+                scores = [random.randint(40, 100) for _ in subjects]
+                if writer:
+                    writer.writerow([next_id, f'Student {next_id}'] + scores)
+                else:
+                    f.write(json.dumps({'id': next_id, 'name': f'Student {next_id}',
+                                        'scores': dict(zip(subjects, scores))}) + '\n')
+                next_id += 1
+
+
+def benchmark_sharded(directory, worker_counts=(1, 2, 4, 8)):
+    """Run the sharded analysis at several pool sizes and report scaling"""
+    import contextlib
+    import io
+    
+    rows = []
+    for workers in worker_counts:
+        analyzer = StudentScoreAnalyzer()
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, _, timings = analyzer.analyze_shards(directory, workers=workers)
+        rows.append(timings)
+    
+    baseline = rows[0]['map_seconds']
+    print(f"Sharded analysis benchmark on '{directory}'")
+    print(f"{'workers':>8} {'map s':>8} {'reduce ms':>10} {'shards/s':>9} {'students/s':>12} {'speedup':>8}")
+    for timings in rows:
+        print(f"{timings['workers']:>8} {timings['map_seconds']:>8.2f} "
+              f"{timings['reduce_seconds'] * 1000:>10.2f} {timings['shards_per_sec']:>9.1f} "
+              f"{timings['students_per_sec']:>12,.0f} {baseline / timings['map_seconds']:>7.1f}x")
+    return rows
 
 def main():
     """Main execution function"""
     analyzer = StudentScoreAnalyzer()
+    # Per-stage timings, enabled by PIPELINE_METRICS (see pipeline_metrics.py)
+    metrics = PipelineMetrics.from_env('scores')
     
     print("Starting Student Score Analysis...")
     print("-" * 80)
     
-    # Step 1: Fetch data
-    analyzer.fetch_student_data()
-    
-    # Step 2: Calculate statistics
-    stats = analyzer.calculate_statistics()
-    
-    # Step 3: Display results
-    analyzer.display_statistics(stats)
-    
-    # Step 4: Create visualizations
-    analyzer.create_visualizations(stats)
-    
-    # Step 5: Export results
-    analyzer.export_results(stats)
+    try:
+        # Step 1: Fetch data
+        with metrics.stage('fetch') as stage:
+            stage.rows = len(analyzer.fetch_student_data())
+        
+        # Step 2: Calculate statistics
+        with metrics.stage('calculate') as stage:
+            stats = analyzer.calculate_statistics()
+            stage.rows = len(analyzer.student_data)
+        
+        # Step 3: Display results
+        with metrics.stage('display') as stage:
+            analyzer.display_statistics(stats)
+            analyzer.display_rankings()
+            stage.rows = len(stats or ())
+        
+        # Step 4: Create visualizations
+        with metrics.stage('visualize') as stage:
+            filename = analyzer.create_visualizations(stats)
+            if filename:
+                stage.bytes = os.path.getsize(filename)
+        
+        # Step 5: Export results
+        with metrics.stage('export') as stage:
+            analyzer.export_results(stats, top_k=10)
+            stage.rows = len(analyzer.student_data)
+            stage.bytes = os.path.getsize('student_analysis_results.json')
+    finally:
+        metrics.emit()
     
     print("\n" + "="*80)
     print("Analysis Complete!")
@@ -0,0 +1,140 @@
+"""
+Shared SQLite access layer for books.db and users.db.
+
+A Database owns one writer connection, used for every write and schema
+change, and a bounded pool of read-only connections for queries. In WAL
+mode readers work from the last committed snapshot, so a display or
+statistics query does not wait for an import's open write transaction.
+Each connection keeps a statement cache, so repeated queries (keyset pages,
+batch inserts) are prepared once per connection instead of once per call.
+"""
+import pathlib
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Prepared statements kept per connection (sqlite3's default is 128)
+STATEMENT_CACHE_SIZE = 256
+
+
+class Database:
+    """One writer connection plus a pool of up to `readers` read-only connections"""
+
+    def __init__(self, path, readers=4, journal_mode='WAL', synchronous='NORMAL',
+                 cache_size_kib=64 * 1024, mmap_size=256 * 1024 * 1024, busy_timeout=30.0):
+        self.path = path
+        self.cache_size_kib = cache_size_kib
+        self.mmap_size = mmap_size
+        self.busy_timeout = busy_timeout
+        # An in-memory database is private to its connection: no reader pool
+        self.max_readers = 0 if path == ':memory:' else readers
+
+        self.writer = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False,
+                                      cached_statements=STATEMENT_CACHE_SIZE)
+        if path != ':memory:':
+            self.writer.execute(f'PRAGMA journal_mode={journal_mode}')
+        self.writer.execute(f'PRAGMA synchronous={synchronous}')
+        self._tune(self.writer)
+        # Held for each transaction() and, without a reader pool, for each read
+        self.write_lock = threading.RLock()
+
+        self._idle = queue.LifoQueue()
+        self._opened = []
+        self._pool_lock = threading.Lock()
+        self._savepoints = 0
+
+    def _tune(self, conn):
+        conn.execute(f'PRAGMA cache_size=-{int(self.cache_size_kib)}')
+        conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+
+    def _open_reader(self):
+        # as_uri() percent-encodes characters such as '#' and '?' in the path
+        uri = pathlib.Path(self.path).resolve().as_uri() + '?mode=ro'
+        conn = sqlite3.connect(uri, uri=True, timeout=self.busy_timeout,
+                               check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
+        # Autocommit: a reader never holds a snapshot open between queries
+        conn.isolation_level = None
+        self._tune(conn)
+        conn.execute('PRAGMA query_only=1')
+        return conn
+
+    @contextmanager
+    def reader(self):
+        """
+        Borrow a read-only connection for the duration of the with block,
+        opening one if fewer than max_readers exist and waiting otherwise.
+        Without a pool, reads go through the writer under write_lock.
+        """
+        if not self.max_readers:
+            with self.write_lock:
+                yield self.writer
+            return
+
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._pool_lock:
+                if len(self._opened) < self.max_readers:
+                    conn = self._open_reader()
+                    self._opened.append(conn)
+            if conn is None:
+                conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def query(self, sql, params=()):
+        """Run one read query on a pooled connection and return all rows"""
+        with self.reader() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    @contextmanager
+    def transaction(self, mode='IMMEDIATE'):
+        """
+        Run the with block as one write transaction on the writer connection
+        and yield its cursor; commit on success, roll back on any exception.
+        IMMEDIATE takes the write lock up front so the transaction cannot fail
+        half way with SQLITE_BUSY. Nested use becomes a savepoint.
+        """
+        with self.write_lock:
+            cursor = self.writer.cursor()
+            if self.writer.in_transaction:
+                self._savepoints += 1
+                name = f'sp_{self._savepoints}'
+                cursor.execute(f'SAVEPOINT {name}')
+                try:
+                    yield cursor
+                except BaseException:
+                    cursor.execute(f'ROLLBACK TO {name}')
+                    cursor.execute(f'RELEASE {name}')
+                    raise
+                else:
+                    cursor.execute(f'RELEASE {name}')
+                finally:
+                    self._savepoints -= 1
+                    cursor.close()
+                return
+
+            cursor.execute(f'BEGIN {mode}')
+            try:
+                yield cursor
+            except BaseException:
+                self.writer.rollback()
+                raise
+            else:
+                self.writer.commit()
+            finally:
+                cursor.close()
+
+    def close(self):
+        """Close the pooled readers and the writer"""
+        with self._pool_lock:
+            for conn in self._opened:
+                conn.close()
+            self._opened.clear()
+        self._idle = queue.LifoQueue()
+        self.writer.close()